@@ -0,0 +1,460 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import concurrent.futures
+import multiprocessing
+from utils.log_config import LoggerConfig
+from utils.metrics import MetricsRecorder
+from utils.synthetic_corpus import SyntheticCorpusGenerator
+
+
+# Pipeline stages in execution order
+STAGES = [
+    "parse_emails",
+    "text_extract",
+    "process_data",
+    "format_date",
+    "create_corpus",
+    "train_lda_model",
+    "coherence_score",
+    "save_to_db",
+]
+
+
+def run_scale(
+    json_dir,
+    num_emails,
+    stages,
+    num_topics,
+    num_passes,
+    num_processors,
+    profile=False,
+    trace_memory=False,
+    lean=False,
+):
+    """
+    Run the pipeline stages once over a generated corpus and measure each stage.
+
+    Runs in a fresh process (see `PipelineBenchmark.run`) so that the peak RSS
+    of a scale is not polluted by earlier, larger scales.
+
+    Parameters:
+        json_dir (str): Directory with the synthetic JSON emails.
+        num_emails (int): Number of emails in `json_dir`.
+        stages (list): Names of the stages to measure; see `STAGES`.
+        num_topics (int): Number of LDA topics.
+        num_passes (int): Number of LDA passes.
+        num_processors (int): Number of worker processes for gensim.
+        profile (bool): Capture a cProfile of each measured stage.
+        trace_memory (bool): Capture the tracemalloc peak of each measured stage.
+        lean (bool): Run the pipeline in memory-lean mode.
+
+    Returns:
+        list: One dictionary of measurements per stage.
+    """
+    # Heavy imports are deferred to the worker process
+    from data_wrangler import DataWrangler
+    from email_processing import EmailProcessing
+    from topic_model import TopicModeling
+    from utils.db_manager import DatabaseManager
+
+    # Capture only the requested stages; the instrumented pipeline methods
+    # record their own (nested) stages on the process-wide recorder
+    capture = set(stages)
+    recorder = MetricsRecorder(
+        run_name=f"benchmark_{num_emails}",
+        profile=capture if profile else False,
+        trace_memory=capture if trace_memory else False,
+    )
+    state = {}
+
+    def measure(stage, func):
+        with recorder.stage(stage, rows=num_emails):
+            return func()
+
+    # Run every stage the requested ones depend on, but only record the requested
+    last_stage = max(STAGES.index(stage) for stage in stages)
+    needed = STAGES[: last_stage + 1]
+
+    state["emails_df"] = measure(
+        "parse_emails", lambda: DataWrangler(json_dir, lean=lean).parse_emails()
+    )
+    processing = EmailProcessing(lean=lean)
+    if "text_extract" in needed:
+        measure(
+            "text_extract",
+            lambda: state["emails_df"]["text"].apply(processing.text_extract),
+        )
+    if "process_data" in needed:
+        state["processed_df"] = measure(
+            "process_data", lambda: processing.process_data(state["emails_df"])
+        )
+    if "format_date" in needed:
+        measure("format_date", lambda: processing.format_date(state["processed_df"]))
+    if "create_corpus" in needed:
+        # TopicModeling expects tokens as stored in SQLite (space separated)
+        topics_df = state["processed_df"] if lean else state["processed_df"].copy()
+        topics_df["tokens"] = topics_df["tokens"].apply(" ".join)
+        topics = TopicModeling(topics_df, num_processors=num_processors, lean=lean)
+        # Through the cache, so that training reuses the measured corpus
+        state["dictionary"], state["corpus"] = measure(
+            "create_corpus", topics._get_corpus
+        )
+    if "train_lda_model" in needed:
+        state["lda_model"] = measure(
+            "train_lda_model",
+            lambda: topics.train_lda_model(num_passes=num_passes, num_topics=num_topics),
+        )
+    if "coherence_score" in needed:
+        measure(
+            "coherence_score",
+            lambda: topics.coherence_score(state["dictionary"], state["lda_model"]),
+        )
+    if "save_to_db" in needed:
+        db_path = os.path.join(os.path.dirname(json_dir), "benchmark.db")
+        manager = DatabaseManager(db_path)
+        measure(
+            "save_to_db",
+            lambda: manager.save_to_db(
+                state["processed_df"].copy(), table_name="emails_processed"
+            ),
+        )
+        manager.close_db()
+
+    return [
+        {"scale": num_emails, **record}
+        for record in recorder.records
+        if record["stage"] in capture
+    ]
+
+
+class PipelineBenchmark:
+    """
+    Reproducible per-stage benchmark of the email pipeline over synthetic corpora.
+
+    For each scale, a synthetic corpus is generated with a fixed seed and the
+    pipeline stages are run in a fresh process. Each stage reports wall time,
+    CPU time, throughput (rows/s) and the process peak RSS after the stage.
+    Across scales, a scaling exponent is fitted per stage: the slope of
+    log(wall time) against log(number of emails), where 1.0 is linear.
+
+    Attributes:
+        scales (list): Number of emails per run, e.g. [1000, 10000, 100000].
+        stages (list): Names of the stages to measure. Defaults to all `STAGES`.
+        seed (int): Seed of the synthetic corpus generator. Defaults to 42.
+        num_topics (int): Number of LDA topics. Defaults to 10.
+        num_passes (int): Number of LDA passes. Defaults to 1.
+        num_processors (int): Number of worker processes for gensim. Defaults to 1.
+        work_dir (str): Directory for generated corpora. Defaults to a temporary directory.
+        keep_corpus (bool): Keep the generated corpora after the run. Defaults to False.
+        profile (bool): Capture a cProfile of each measured stage. Defaults to False.
+        trace_memory (bool): Capture the tracemalloc peak of each measured stage. Defaults to False.
+        lean (bool): Run the pipeline in memory-lean mode. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        scales,
+        stages=None,
+        seed=42,
+        num_topics=10,
+        num_passes=1,
+        num_processors=1,
+        work_dir=None,
+        keep_corpus=False,
+        profile=False,
+        trace_memory=False,
+        lean=False,
+    ):
+        self.logger = LoggerConfig(logger_name="PipelineBenchmark").get_logger()
+        self.scales = sorted(scales)
+        self.stages = stages or list(STAGES)
+        unknown = set(self.stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown benchmark stages: {sorted(unknown)}")
+        self.seed = seed
+        self.num_topics = num_topics
+        self.num_passes = num_passes
+        self.num_processors = num_processors
+        self.work_dir = work_dir
+        self.keep_corpus = keep_corpus
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.lean = lean
+
+    def run(self):
+        """
+        Generate the corpora, run every scale and fit the scaling curves.
+
+        Returns:
+            dict: Machine-readable results with `environment`, `config`,
+            `results` (one row per scale and stage) and `scaling`.
+        """
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix="enron_bench_")
+        results = []
+        try:
+            for num_emails in self.scales:
+                json_dir = os.path.join(work_dir, f"emails_{num_emails}", "json")
+                if not os.path.isdir(json_dir):
+                    generator = SyntheticCorpusGenerator(seed=self.seed)
+                    generator.generate(json_dir, num_emails, logger=self.logger)
+
+                self.logger.info(f"Benchmarking {num_emails} emails")
+                # A fresh spawned process per scale keeps peak RSS comparable
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=LoggerConfig.configure_worker,
+                    initargs=(LoggerConfig.get_worker_queue(),),
+                ) as executor:
+                    future = executor.submit(
+                        run_scale,
+                        json_dir,
+                        num_emails,
+                        self.stages,
+                        self.num_topics,
+                        self.num_passes,
+                        self.num_processors,
+                        self.profile,
+                        self.trace_memory,
+                        self.lean,
+                    )
+                    scale_results = future.result()
+
+                for row in scale_results:
+                    self.logger.info(
+                        f"{row['stage']} @ {num_emails}: {row['wall_time_s']:.2f} s, "
+                        f"{row['rows_per_s']:.0f} rows/s, peak RSS {row['peak_rss_mb']:.0f} MB"
+                    )
+                results.extend(scale_results)
+        finally:
+            if not self.keep_corpus and not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        return {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "config": {
+                "scales": self.scales,
+                "stages": self.stages,
+                "seed": self.seed,
+                "num_topics": self.num_topics,
+                "num_passes": self.num_passes,
+                "num_processors": self.num_processors,
+                "lean": self.lean,
+            },
+            "results": results,
+            "scaling": self.scaling_curves(results),
+        }
+
+    @staticmethod
+    def scaling_curves(results):
+        """
+        Fit the scaling exponent of each stage by least squares in log-log space.
+
+        Parameters:
+            results (list): Rows as returned by `run_scale`.
+
+        Returns:
+            dict: Per stage, the points (scale, wall time) and the fitted
+            exponent (None when fewer than two scales were run).
+        """
+        curves = {}
+        for stage in STAGES:
+            points = [
+                (row["scale"], row["wall_time_s"])
+                for row in results
+                if row["stage"] == stage and row["wall_time_s"] > 0
+            ]
+            if not points:
+                continue
+            exponent = None
+            if len(points) > 1:
+                xs = [math.log(scale) for scale, _ in points]
+                ys = [math.log(wall_time) for _, wall_time in points]
+                mean_x = sum(xs) / len(xs)
+                mean_y = sum(ys) / len(ys)
+                var_x = sum((x - mean_x) ** 2 for x in xs)
+                if var_x > 0:
+                    exponent = (
+                        sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+                        / var_x
+                    )
+            curves[stage] = {"points": points, "exponent": exponent}
+        return curves
+
+    def save(self, report, output_path):
+        """
+        Save the benchmark report as JSON, or as CSV rows if the path ends in `.csv`.
+
+        Parameters:
+            report (dict): The report returned by `run`.
+            output_path (str): Destination file path.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if output_path.endswith(".csv"):
+            import csv
+
+            with open(output_path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=list(report["results"][0]))
+                writer.writeheader()
+                writer.writerows(report["results"])
+        else:
+            with open(output_path, "w") as file:
+                json.dump(report, file, indent=2)
+        self.logger.info(f"Benchmark report saved to: {output_path}")
+
+
+def measure_startup(repeats=5, budget_s=0.5):
+    """
+    Measure the start-up time of the short CLI commands in fresh interpreters.
+
+    Each command is run `repeats` times as a subprocess against a small
+    SQLite database; the median wall time is compared with `budget_s`. The
+    modules imported by each command are recorded with `python -X importtime`
+    so that a heavy import sneaking into the start-up path is easy to spot.
+
+    Parameters:
+        repeats (int): Number of runs per command. Defaults to 5.
+        budget_s (float): Start-up budget per command in seconds. Defaults to 0.5.
+
+    Returns:
+        list: Per command, the median and max wall time, whether it is within
+        budget and the slowest imports (cumulative microseconds).
+    """
+    import sqlite3
+    import statistics
+    import subprocess
+
+    cli_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cli.py")
+    work_dir = tempfile.mkdtemp(prefix="enron_startup_")
+    db_path = os.path.join(work_dir, "emails.db")
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE emails (message_id TEXT, "from" TEXT, subject TEXT)')
+    connection.execute("INSERT INTO emails VALUES ('<1>', 'a@enron.com', 'Hello')")
+    connection.commit()
+    connection.close()
+
+    commands = [
+        ["--help"],
+        ["status"],
+        ["stats", "--db", db_path],
+        ["query", "--db", db_path, "--limit", "1"],
+    ]
+    results = []
+    try:
+        for command in commands:
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run(
+                    [sys.executable, cli_path, *command],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                times.append(time.perf_counter() - start)
+
+            # Slowest top-level imports, from "import time: self | cumulative | name"
+            importtime = subprocess.run(
+                [sys.executable, "-X", "importtime", cli_path, *command],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+            ).stderr
+            imports = []
+            for line in importtime.splitlines():
+                fields = line.split("|")
+                if len(fields) == 3 and fields[1].strip().isdigit():
+                    name = fields[2].rstrip()
+                    # Top-level imports are indented by a single space
+                    if not name.startswith("  "):
+                        imports.append((name.strip(), int(fields[1])))
+            imports.sort(key=lambda item: item[1], reverse=True)
+
+            median = statistics.median(times)
+            results.append(
+                {
+                    "command": " ".join(command[:1]),
+                    "median_s": median,
+                    "max_s": max(times),
+                    "budget_s": budget_s,
+                    "within_budget": median <= budget_s,
+                    "slowest_imports_us": imports[:10],
+                }
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    # Get the absolute path of the current directory (e.g., src)
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    # Navigate up one level to reach the root directory
+    root_dir = os.path.abspath(os.path.join(current_dir, "../"))
+
+    parser = argparse.ArgumentParser(description="Benchmark the Enron email pipeline")
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=[1000, 10000], help="Emails per run"
+    )
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--num-topics", type=int, default=10)
+    parser.add_argument("--num-passes", type=int, default=1)
+    parser.add_argument("--num-processors", type=int, default=1)
+    parser.add_argument("--work-dir", default=None, help="Reuse generated corpora")
+    parser.add_argument("--profile", action="store_true", help="cProfile each stage")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="tracemalloc each stage"
+    )
+    parser.add_argument("--lean", action="store_true", help="Memory-lean pipeline")
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Only check CLI start-up times; exit 1 if over budget",
+    )
+    parser.add_argument("--startup-budget", type=float, default=0.5)
+    parser.add_argument(
+        "--output",
+        default=f"{root_dir}/data/benchmarks/benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json",
+        help="Report path (.json or .csv)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        startup = measure_startup(budget_s=args.startup_budget)
+        print(json.dumps(startup, indent=2))
+        return 0 if all(result["within_budget"] for result in startup) else 1
+
+    benchmark = PipelineBenchmark(
+        scales=args.scales,
+        stages=args.stages,
+        seed=args.seed,
+        num_topics=args.num_topics,
+        num_passes=args.num_passes,
+        num_processors=args.num_processors,
+        work_dir=args.work_dir,
+        keep_corpus=args.work_dir is not None,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        lean=args.lean,
+    )
+    report = benchmark.run()
+    benchmark.save(report, args.output)
+    print(json.dumps(report["scaling"], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
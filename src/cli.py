@@ -0,0 +1,387 @@
+"""
+Command-line entry point for the Enron Project.
+
+Usage (from the `src` directory):
+    python cli.py parse ../data/emails/
+    python cli.py process
+    python cli.py topics --num-topics 10 --num-processors 6
+    python cli.py topics --engine nmf --num-passes 5
+    python cli.py topics --compare
+    python cli.py dynamic --freq Q --num-processors 6
+    python cli.py query --where "folder LIKE '%inbox%'" --limit 5
+    python cli.py stats
+    python cli.py status
+    python cli.py serve --port 8765
+    python cli.py benchmark --scales 1000 10000
+
+Only the standard library is imported at startup. pandas, nltk, gensim and
+pyLDAvis are imported by the subcommands that need them, so the short
+operational commands (query, stats, status) start in a fraction of a second.
+"""
+import os
+import sys
+import argparse
+
+
+# Get the absolute path of the current directory (e.g., src)
+CURRENT_DIR = os.path.abspath(os.path.dirname(__file__))
+# Navigate up one level to reach the root directory
+ROOT_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "../"))
+
+DEFAULT_DB = f"{ROOT_DIR}/data/emails.db"
+DEFAULT_PROCESSED_DB = f"{ROOT_DIR}/data/emails_processed.db"
+
+
+def _configure_metrics(args):
+    """Install a metrics recorder for the run if profiling or a metrics file was requested."""
+    from utils.metrics import MetricsRecorder, set_metrics
+
+    if args.profile or args.metrics:
+        set_metrics(MetricsRecorder(profile=args.profile, trace_memory=args.profile))
+
+
+def _save_metrics(args):
+    """Save the run's stage metrics if requested."""
+    from utils.metrics import get_metrics
+
+    if args.metrics:
+        get_metrics().save(args.metrics)
+
+
+def _load_table(db_path, table_name, columns=None):
+    """
+    Load a table from an SQLite database into a DataFrame, in rowid order.
+
+    With `columns`, only the rowid and those columns are loaded, e.g. when the
+    tokens are streamed with `TokenStream` instead.
+    """
+    import sqlite3
+    import pandas as pd
+
+    selected = "*"
+    if columns is not None:
+        selected = ", ".join(["rowid AS rowid"] + [f'"{column}"' for column in columns])
+    connection = sqlite3.connect(db_path)
+    # Same row order as `TokenStream`, which reads the tokens by rowid
+    emails_df = pd.read_sql_query(
+        f"SELECT {selected} FROM {table_name} ORDER BY rowid", connection
+    )
+    connection.close()
+    return emails_df
+
+
+def cmd_parse(args):
+    from data_wrangler import DataWrangler
+
+    _configure_metrics(args)
+    data_wrangler = DataWrangler(args.json_dir, lean=args.lean)
+    emails_df = data_wrangler.parse_emails(save_db_path=args.db, table_name=args.table)
+    print(f"Parsed {len(emails_df)} emails into {args.db} ({args.table})")
+    _save_metrics(args)
+
+
+def cmd_process(args):
+    from email_processing import EmailProcessing
+
+    _configure_metrics(args)
+    emails_df = _load_table(args.db, args.table)
+    email = EmailProcessing(lean=args.lean)
+    emails_df = email.process_data(
+        emails_df, save_db_path=args.out_db, table_name=args.out_table
+    )
+    print(f"Processed {len(emails_df)} emails into {args.out_db} ({args.out_table})")
+    _save_metrics(args)
+
+
+def cmd_topics(args):
+    from topic_model import TopicModeling
+    from utils.vocabulary import TokenStream
+
+    _configure_metrics(args)
+    # Tokens are streamed from the table; dominant topics are written back by rowid
+    emails_df = _load_table(args.db, args.table, columns=[])
+    topics = TopicModeling(
+        emails_df,
+        num_processors=args.num_processors,
+        save_db_path=args.db,
+        lean=args.lean,
+        no_below=args.no_below,
+        no_above=args.no_above,
+        keep_n=args.keep_n,
+        engine=args.engine,
+        tokens=TokenStream(args.db, args.table),
+    )
+    if args.compare:
+        comparison_df = topics.compare_engines(
+            num_passes=args.num_passes, num_topics=args.num_topics
+        )
+        print(f"Topic Engines:\n{comparison_df}")
+    else:
+        emails_df, ranked_topics_df = topics.topic_model(
+            num_passes=args.num_passes, num_topics=args.num_topics
+        )
+        print(f"Ranked Topics:\n{ranked_topics_df}")
+    _save_metrics(args)
+
+
+def cmd_query(args):
+    import json
+    import sqlite3
+
+    columns = ", ".join(f'"{column}"' for column in args.columns) if args.columns else "*"
+    sql = f"SELECT {columns} FROM {args.table}"
+    if args.where:
+        sql += f" WHERE {args.where}"
+    sql += f" LIMIT {int(args.limit)}"
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    connection = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    cursor = connection.execute(sql)
+    column_names = [description[0] for description in cursor.description]
+    if args.format == "json":
+        for row in cursor:
+            print(json.dumps(dict(zip(column_names, row)), default=str))
+    else:
+        print("\t".join(column_names))
+        for row in cursor:
+            print("\t".join(str(value).replace("\n", " ")[: args.width] for value in row))
+    connection.close()
+
+
+def cmd_stats(args):
+    import sqlite3
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+    connection = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    tables = [
+        row[0]
+        for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        )
+    ]
+    print(f"Database: {args.db} ({os.path.getsize(args.db) / (1024 * 1024):.1f} MB)")
+    for table in tables:
+        count = connection.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{table}")')]
+        print(f"{table}: {count} rows, {len(columns)} columns")
+        print(f"  {', '.join(columns)}")
+    connection.close()
+
+
+def cmd_status(args):
+    import glob
+
+    def describe(path):
+        if not os.path.exists(path):
+            return "missing"
+        return f"{os.path.getsize(path) / (1024 * 1024):.1f} MB"
+
+    emails_dir = f"{ROOT_DIR}/data/emails"
+    num_json = (
+        sum(1 for entry in os.scandir(emails_dir) if entry.name.endswith(".json"))
+        if os.path.isdir(emails_dir)
+        else 0
+    )
+    print(f"Raw emails:      {emails_dir} ({num_json} JSON files)")
+    print(f"Parsed emails:   {DEFAULT_DB} ({describe(DEFAULT_DB)})")
+    print(f"Processed:       {DEFAULT_PROCESSED_DB} ({describe(DEFAULT_PROCESSED_DB)})")
+    model_path = f"{ROOT_DIR}/data/models/lda.model"
+    print(f"LDA model:       {model_path} ({describe(model_path)})")
+
+    for label, pattern in [
+        ("Latest log:     ", f"{ROOT_DIR}/logs/*.log"),
+        ("Latest metrics: ", f"{ROOT_DIR}/logs/metrics/*.json"),
+        ("Latest bench:   ", f"{ROOT_DIR}/data/benchmarks/*.json"),
+    ]:
+        paths = glob.glob(pattern)
+        latest = max(paths, key=os.path.getmtime) if paths else "none"
+        print(f"{label} {latest}")
+
+
+def cmd_dynamic(args):
+    from dynamic_topics import DynamicTopicModeling
+    from utils.vocabulary import TokenStream
+
+    _configure_metrics(args)
+    # Tokens are streamed from the table; only the dates are loaded
+    emails_df = _load_table(args.db, args.table, columns=["datetime"])
+    topics = DynamicTopicModeling(
+        emails_df,
+        freq=args.freq,
+        min_docs=args.min_docs,
+        num_processors=args.num_processors,
+        save_db_path=args.db,
+        lean=args.lean,
+        tokens=TokenStream(args.db, args.table),
+    )
+    try:
+        evolution_df = topics.dynamic_topics(
+            num_topics=args.num_topics,
+            base_passes=args.base_passes,
+            slice_passes=args.slice_passes,
+        )
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(evolution_df.pivot(index="period", columns="topic", values="prevalence"))
+    _save_metrics(args)
+
+
+def cmd_serve(args):
+    from topic_service import TopicInferenceService, serve
+
+    service = TopicInferenceService(
+        max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms
+    )
+    service.load_model(args.model, version=args.version)
+    serve(service, host=args.host, port=args.port, model_dir=args.model_dir)
+
+
+def cmd_benchmark(args):
+    import benchmark
+
+    return benchmark.main(args.benchmark_args)
+
+
+def build_parser():
+    """
+    Build the argument parser with one subparser per command.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="enron", description="Enron email pipeline and tools"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by the pipeline commands
+    pipeline = argparse.ArgumentParser(add_help=False)
+    pipeline.add_argument("--lean", action="store_true", help="Memory-lean mode")
+    pipeline.add_argument("--metrics", help="Save stage metrics (.json or .csv)")
+    pipeline.add_argument(
+        "--profile", action="store_true", help="cProfile and tracemalloc each stage"
+    )
+
+    parser_parse = subparsers.add_parser(
+        "parse", parents=[pipeline], help="Parse JSON emails into SQLite"
+    )
+    parser_parse.add_argument("json_dir", help="Directory with the JSON emails")
+    parser_parse.add_argument("--db", default=DEFAULT_DB)
+    parser_parse.add_argument("--table", default="emails")
+    parser_parse.set_defaults(func=cmd_parse)
+
+    parser_process = subparsers.add_parser(
+        "process", parents=[pipeline], help="Pre-process parsed emails"
+    )
+    parser_process.add_argument("--db", default=DEFAULT_DB)
+    parser_process.add_argument("--table", default="emails")
+    parser_process.add_argument("--out-db", default=DEFAULT_PROCESSED_DB)
+    parser_process.add_argument("--out-table", default="emails_processed")
+    parser_process.set_defaults(func=cmd_process)
+
+    parser_topics = subparsers.add_parser(
+        "topics", parents=[pipeline], help="Train the topic model"
+    )
+    parser_topics.add_argument("--db", default=DEFAULT_PROCESSED_DB)
+    parser_topics.add_argument("--table", default="emails_processed")
+    parser_topics.add_argument("--num-topics", type=int, default=10)
+    parser_topics.add_argument("--num-passes", type=int, default=10)
+    parser_topics.add_argument("--num-processors", type=int, default=1)
+    parser_topics.add_argument(
+        "--no-below", type=int, default=5, help="Minimum document frequency"
+    )
+    parser_topics.add_argument(
+        "--no-above", type=float, default=0.5, help="Maximum document fraction"
+    )
+    parser_topics.add_argument(
+        "--keep-n", type=int, default=100000, help="Keep the top-K tokens"
+    )
+    parser_topics.add_argument(
+        "--engine",
+        choices=["lda", "nmf"],
+        default="lda",
+        help="Topic engine: gensim LDA or TF-IDF + MiniBatch NMF",
+    )
+    parser_topics.add_argument(
+        "--compare",
+        action="store_true",
+        help="Train both engines and compare coherence and throughput",
+    )
+    parser_topics.set_defaults(func=cmd_topics)
+
+    parser_query = subparsers.add_parser("query", help="Query an email table")
+    parser_query.add_argument("--db", default=DEFAULT_DB)
+    parser_query.add_argument("--table", default="emails")
+    parser_query.add_argument("--columns", nargs="+", default=None)
+    parser_query.add_argument("--where", default=None, help="SQL WHERE clause")
+    parser_query.add_argument("--limit", type=int, default=10)
+    parser_query.add_argument("--format", choices=["tsv", "json"], default="tsv")
+    parser_query.add_argument(
+        "--width", type=int, default=80, help="Maximum characters per TSV value"
+    )
+    parser_query.set_defaults(func=cmd_query)
+
+    parser_stats = subparsers.add_parser("stats", help="Show tables and row counts")
+    parser_stats.add_argument("--db", default=DEFAULT_DB)
+    parser_stats.set_defaults(func=cmd_stats)
+
+    parser_status = subparsers.add_parser("status", help="Show pipeline artifacts")
+    parser_status.set_defaults(func=cmd_status)
+
+    parser_dynamic = subparsers.add_parser(
+        "dynamic", parents=[pipeline], help="Train time-sliced dynamic topics"
+    )
+    parser_dynamic.add_argument("--db", default=DEFAULT_PROCESSED_DB)
+    parser_dynamic.add_argument("--table", default="emails_processed")
+    parser_dynamic.add_argument("--freq", choices=["M", "Q"], default="Q")
+    parser_dynamic.add_argument("--min-docs", type=int, default=100)
+    parser_dynamic.add_argument("--num-topics", type=int, default=10)
+    parser_dynamic.add_argument("--base-passes", type=int, default=2)
+    parser_dynamic.add_argument("--slice-passes", type=int, default=2)
+    parser_dynamic.add_argument("--num-processors", type=int, default=1)
+    parser_dynamic.set_defaults(func=cmd_dynamic)
+
+    parser_serve = subparsers.add_parser(
+        "serve", help="Serve topic inference over HTTP on localhost"
+    )
+    parser_serve.add_argument("--model", default=f"{ROOT_DIR}/data/models/lda.model")
+    parser_serve.add_argument("--version", default=None, help="Model version name")
+    parser_serve.add_argument(
+        "--model-dir",
+        default=f"{ROOT_DIR}/data/models",
+        help="Only directory that POST /models may load models from",
+    )
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8765)
+    parser_serve.add_argument("--max-batch-size", type=int, default=64)
+    parser_serve.add_argument("--max-wait-ms", type=float, default=5)
+    parser_serve.set_defaults(func=cmd_serve)
+
+    # All benchmark arguments, including --help, are forwarded to benchmark.main
+    parser_benchmark = subparsers.add_parser(
+        "benchmark",
+        add_help=False,
+        help="Run the pipeline benchmark (see benchmark.py --help)",
+    )
+    parser_benchmark.set_defaults(func=cmd_benchmark)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra_args = parser.parse_known_args(argv)
+    if args.command == "benchmark":
+        args.benchmark_args = extra_args
+    elif extra_args:
+        parser.error(f"unrecognized arguments: {' '.join(extra_args)}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
 import os
 import json
-import time
 import pandas as pd
-from utils.log_config import LoggerConfig
+from utils.log_config import LoggerConfig, ProgressLogger
 from utils.db_manager import DatabaseManager
+from utils.metrics import get_metrics
+from utils.memory import optimize_dtypes
 
 
 class DataWrangler:
-    def __init__(self, json_dir):
+    def __init__(self, json_dir, metrics=None, lean=False):
         self.json_dir = json_dir
         self.logger = LoggerConfig(logger_name="DataWrangler").get_logger()
+        self.metrics = metrics or get_metrics()
+        # Memory-lean mode: compact dtypes for the parsed DataFrame
+        self.lean = lean
         current_dir = os.path.abspath(os.path.dirname(__file__))
         db_path = os.path.abspath(os.path.join(current_dir, "../data/emails.db"))
         self.data_saver = DatabaseManager(db_path,self.logger)
@@ -22,7 +26,8 @@ class DataWrangler:
         This method reads all JSON files in the directory specified by `self.json_dir`,
         extracts relevant email information from each file, and compiles the data into
         a pandas DataFrame. The method also logs the progress and time taken to process
-        each file and the overall operation.
+        each file and the overall operation. In memory-lean mode, low-cardinality
+        header columns are stored as categoricals and free text as Arrow strings.
 
         Returns:
             pd.DataFrame: A DataFrame containing email data with the following columns:
@@ -50,99 +55,96 @@ class DataWrangler:
             FileNotFoundError: If the specified directory does not exist.
             JSONDecodeError: If any of the JSON files cannot be decoded.
         """
-        start_time = time.time()  # Record the start time of the loading process
-        self.logger.info(
-            "Loading emails from JSON files..."
-        )  # Log the start of the loading process
-        data_list = []  # Initialize an empty list to store email data
-
-        # Iterate over all files in the specified directory
-        for filename in os.listdir(self.json_dir):
-            if filename.endswith(".json"):  # Process only JSON files
-                file_path = os.path.join(
-                    self.json_dir, filename
-                )  # Get the full path of the file
-                self.logger.info(
-                    f"Processing file: {file_path}"
-                )  # Log the file being processed
-                file_start_time = (
-                    time.time()
-                )  # Record the start time of processing the file
-
-                with open(file_path, "r") as file:  # Open the JSON file
-                    data = json.load(file)  # Load the JSON data
-                    # Extract relevant fields from the JSON data
-                    email_data = {
-                        # Main email data
-                        "text": data.get("text", ""),
-                        # Headers
-                        "message_id": data["headers"].get("message-id", ""),
-                        "date": data["headers"].get("date", ""),
-                        "from": data["headers"].get("from", ""),
-                        "to": data["headers"].get("to", ""),
-                        "subject": data["headers"].get("subject", ""),
-                        "cc": data["headers"].get("cc", ""),
-                        "bcc": data["headers"].get("bcc", ""),
-                        "mime-version": data["headers"].get("mime-version", ""),
-                        "content-type": data["headers"].get("content-type", ""),
-                        "content-transfer-encoding": data["headers"].get("", ""),
-                        "x-from": data["headers"].get("x-from", ""),
-                        "x-to": data["headers"].get("x-to", ""),
-                        "x-cc": data["headers"].get("x-cc", ""),
-                        "x-bcc": data["headers"].get("x-bcc", ""),
-                        "folder": data["headers"].get("x-folder", ""),
-                        "origin": data["headers"].get("x-origin", ""),
-                        "filename": data["headers"].get("x-filename", ""),
-                        # Main email data
-                        # Commented out since these are duplicate information
-                        # "subject": data.get("subject", ""),
-                        # "messageId": data.get("messageId", ""),
-                        # "date": data.get("date", ""),
-                        # "from": data.get("from", ""),
-                        # "to": data.get("to", ""),
-                        # "cc": data.get("cc", ""),
-                        # "bcc": data.get("bcc", ""),
-                        # "date": data.get("date", ""),
-                        "priority": data.get("priority", ""),
-                    }
-                    data_list.append(email_data)  # Add the email data to the list
-
-                file_end_time = (
-                    time.time()
-                )  # Record the end time of processing the file
-
-                # Log
-                # Total time to parse emails
-                log_proc = f"{file_end_time - file_start_time:.6f} s"
-                self.logger.info(
-                    f"Finished processing file: {file_path} in {log_proc}"
-                )  # Log the time taken to process the file
-
-        # Convert the list of email data to a DataFrame
-        emails_df = pd.DataFrame(data_list)
-
-        # Record the end time of the loading process
-        end_time = time.time()
-
-        # Log the successful loading of emails and the time taken
-        self.logger.info(
-            f"Emails loaded successfully in {end_time - start_time:.2f} seconds."
-        )
+        # Record time, throughput and peak memory of the loading process
+        with self.metrics.stage("parse_emails", logger=self.logger) as timer:
+            emails_df = self._load_json_files()
+            timer.rows = len(emails_df)
+            if self.lean:
+                optimize_dtypes(emails_df, logger=self.logger)
 
         # Save the DataFrame to a CSV file if requested
         if save_csv_path:
-            manager = DatabaseManager(db_path=save_csv_path)
-            manager.save_to_csv(emails_df)
+            manager = DatabaseManager(db_path=save_csv_path, logger=self.logger)
+            manager.save_to_csv(emails_df, save_csv_path)
             self.logger.info(f"Parsed dataset saved to CSV file: {save_csv_path}")
 
         # Save the DataFrame to a SQLite database if requested
         if save_db_path:
-            manager = DatabaseManager(db_path=save_db_path)
+            manager = DatabaseManager(db_path=save_db_path, logger=self.logger)
             manager.save_to_db(emails_df, table_name)
             self.logger.info(f"Parsed dataset saved to SQLite database: {save_db_path}")
 
         return emails_df  # Return the DataFrame
 
+    def _load_json_files(self):
+        """
+        Read every JSON file in `self.json_dir` into a DataFrame of email fields.
+
+        Returns:
+            pd.DataFrame: One row per email; see `parse_emails` for the columns.
+        """
+        data_list = []  # Initialize an empty list to store email data
+
+        # Process only JSON files in the specified directory
+        filenames = [
+            filename
+            for filename in os.listdir(self.json_dir)
+            if filename.endswith(".json")
+        ]
+        # Log progress every 10000 files rather than every file
+        progress = ProgressLogger(self.logger, label="files", total=len(filenames))
+
+        for filename in filenames:
+            file_path = os.path.join(
+                self.json_dir, filename
+            )  # Get the full path of the file
+            self.logger.debug("Processing file: %s", file_path)
+
+            with open(file_path, "r") as file:  # Open the JSON file
+                data = json.load(file)  # Load the JSON data
+                # Extract relevant fields from the JSON data
+                email_data = {
+                    # Main email data
+                    "text": data.get("text", ""),
+                    # Headers
+                    "message_id": data["headers"].get("message-id", ""),
+                    "date": data["headers"].get("date", ""),
+                    "from": data["headers"].get("from", ""),
+                    "to": data["headers"].get("to", ""),
+                    "subject": data["headers"].get("subject", ""),
+                    "cc": data["headers"].get("cc", ""),
+                    "bcc": data["headers"].get("bcc", ""),
+                    "mime-version": data["headers"].get("mime-version", ""),
+                    "content-type": data["headers"].get("content-type", ""),
+                    "content-transfer-encoding": data["headers"].get("", ""),
+                    "x-from": data["headers"].get("x-from", ""),
+                    "x-to": data["headers"].get("x-to", ""),
+                    "x-cc": data["headers"].get("x-cc", ""),
+                    "x-bcc": data["headers"].get("x-bcc", ""),
+                    "folder": data["headers"].get("x-folder", ""),
+                    "origin": data["headers"].get("x-origin", ""),
+                    "filename": data["headers"].get("x-filename", ""),
+                    # Main email data
+                    # Commented out since these are duplicate information
+                    # "subject": data.get("subject", ""),
+                    # "messageId": data.get("messageId", ""),
+                    # "date": data.get("date", ""),
+                    # "from": data.get("from", ""),
+                    # "to": data.get("to", ""),
+                    # "cc": data.get("cc", ""),
+                    # "bcc": data.get("bcc", ""),
+                    # "date": data.get("date", ""),
+                    "priority": data.get("priority", ""),
+                }
+                data_list.append(email_data)  # Add the email data to the list
+
+            progress.update()
+
+        progress.done()
+
+        # Convert the list of email data to a DataFrame
+        return pd.DataFrame(data_list)
+
 
 if __name__ == "__main__":
     # Get the absolute path of the current directory (e.g., src/utils)
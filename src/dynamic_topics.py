@@ -0,0 +1,278 @@
+import os
+import sqlite3
+import concurrent.futures
+import multiprocessing
+import numpy as np
+import pandas as pd
+from topic_model import TopicModeling
+from utils.log_config import LoggerConfig
+from utils.db_manager import DatabaseManager
+
+
+def train_slice(slice_model, slice_corpus, num_passes, num_words):
+    """
+    Warm-start a copy of the base model on one time slice.
+
+    Runs in a worker process: the pickled base model arrives as a private
+    copy, which is updated with the slice's documents only. Starting every
+    slice from the same model keeps its topics close to the base topics, so
+    they can be aligned afterwards.
+
+    Parameters:
+        slice_model (gensim.models.LdaModel): Copy of the model trained on the whole corpus.
+        slice_corpus (list): BoW documents of the slice.
+        num_passes (int): Number of passes over the slice.
+        num_words (int): Number of top terms to return per topic.
+
+    Returns:
+        dict: `topics` (topic-term matrix), `prevalence` (mean topic weight of
+        the slice's documents) and `terms` (top terms per topic).
+    """
+    slice_model.update(slice_corpus, passes=num_passes)
+
+    # Mean document-topic distribution of the slice, from one batched E-step
+    gamma, _ = slice_model.inference(slice_corpus)
+    prevalence = (gamma / gamma.sum(axis=1, keepdims=True)).mean(axis=0)
+
+    return {
+        "topics": slice_model.get_topics().astype(np.float32),
+        "prevalence": prevalence,
+        "terms": [
+            [term for term, _ in slice_model.show_topic(topic_id, topn=num_words)]
+            for topic_id in range(slice_model.num_topics)
+        ],
+    }
+
+
+def align_topics(reference, topics):
+    """
+    Match the topics of a slice to the reference topics one-to-one.
+
+    Topics are compared by Hellinger distance between their term
+    distributions (both models share the vocabulary) and matched with the
+    Hungarian algorithm, which minimizes the total distance.
+
+    Parameters:
+        reference (np.ndarray): Reference topic-term matrix, topics x terms.
+        topics (np.ndarray): Slice topic-term matrix, topics x terms.
+
+    Returns:
+        np.ndarray: For each reference topic, the index of the matching slice topic.
+        np.ndarray: For each reference topic, the similarity (1 - Hellinger distance).
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    # For distributions, sum((sqrt p - sqrt q)^2) = 2 - 2 * sum(sqrt(p * q))
+    affinity = np.sqrt(reference) @ np.sqrt(topics).T
+    distance = np.sqrt(np.clip(1.0 - affinity, 0.0, None))
+    rows, columns = linear_sum_assignment(distance)
+    return columns[np.argsort(rows)], 1.0 - distance[rows, columns][np.argsort(rows)]
+
+
+class DynamicTopicModeling(TopicModeling):
+    """
+    Topic evolution over time from per-slice LDA models.
+
+    A faster alternative to gensim's `LdaSeqModel` for the full corpus:
+
+    1. Emails are partitioned into monthly or quarterly slices by `datetime`.
+    2. A base LDA model is trained on the whole corpus with the shared,
+       pruned vocabulary of `TopicModeling.create_corpus`.
+    3. Each slice warm-starts a copy of the base model and is updated on its
+       own documents; slices are trained in parallel worker processes.
+    4. The topics of each slice are aligned to the base topics, so that
+       topic `k` refers to the same theme in every slice.
+
+    Attributes:
+        freq (str): Pandas period frequency of the slices, "M" (monthly) or "Q" (quarterly). Defaults to "Q".
+        start (str): First date of the studied period. Defaults to "1999-01-01".
+        end (str): Last date of the studied period, included. Defaults to "2002-12-31".
+        min_docs (int): Slices with fewer documents are skipped. Defaults to 100.
+    See `TopicModeling` for the other arguments.
+    """
+
+    def __init__(
+        self,
+        df,
+        freq="Q",
+        start="1999-01-01",
+        end="2002-12-31",
+        min_docs=100,
+        evolution_table_name="topic_evolution",
+        **kwargs,
+    ):
+        super().__init__(df, **kwargs)
+        self.logger = LoggerConfig(logger_name="DynamicTopicModeling").get_logger()
+        self.freq = freq
+        self.start = start
+        self.end = end
+        self.min_docs = min_docs
+        self.evolution_table_name = evolution_table_name
+
+    def time_slices(self):
+        """
+        Group the documents into time slices by their parsed date.
+
+        Emails without a parseable date or outside [start, end] (the corpus
+        contains dates such as 1979 and 2044) are left out.
+
+        Returns:
+            dict: Period (pd.Period) to the positional indexes of its documents,
+            in chronological order.
+        """
+        dates = pd.to_datetime(self.df["datetime"], errors="coerce")
+        # Emails sent at any time on the end date are included
+        in_range = (dates >= pd.Timestamp(self.start)) & (
+            dates < pd.Timestamp(self.end) + pd.Timedelta(days=1)
+        )
+        periods = dates[in_range].dt.to_period(self.freq)
+        positions = pd.Series(np.flatnonzero(in_range.to_numpy()), index=periods.index)
+
+        slices = {}
+        for period, indexes in positions.groupby(periods.to_numpy()):
+            if len(indexes) < self.min_docs:
+                self.logger.info(
+                    f"Skipping slice {period} with {len(indexes)} documents"
+                )
+                continue
+            slices[period] = indexes.to_numpy()
+        self.logger.info(
+            f"{len(slices)} {self.freq} slices with {sum(map(len, slices.values()))} "
+            f"of {len(self.df)} documents"
+        )
+        return dict(sorted(slices.items()))
+
+    def train_base_model(self, num_passes=2, num_topics=10):
+        """
+        Train the shared base model on the whole corpus.
+
+        Parameters:
+            num_passes (int): Number of passes. Defaults to 2.
+            num_topics (int): Number of topics. Defaults to 10.
+
+        Returns:
+            gensim.models.LdaModel: The base model.
+        """
+        return self.train_lda_model(num_passes=num_passes, num_topics=num_topics)
+
+    def dynamic_topics(
+        self, num_topics=10, base_passes=2, slice_passes=2, num_words=10
+    ):
+        """
+        Train the per-slice models in parallel and align their topics.
+
+        Parameters:
+            num_topics (int): Number of topics. Defaults to 10.
+            base_passes (int): Passes of the base model over the whole corpus. Defaults to 2.
+            slice_passes (int): Passes of each slice model over its slice. Defaults to 2.
+            num_words (int): Number of top terms per topic and slice. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: Topic evolution with one row per slice and aligned
+            topic: period, topic, documents, prevalence, similarity to the base
+            topic and top terms.
+
+        Raises:
+            ValueError: If no time slice has at least `min_docs` documents.
+        """
+        from gensim.models import LdaModel
+
+        slices = self.time_slices()
+        if not slices:
+            raise ValueError(
+                f"No {self.freq} slice between {self.start} and {self.end} has at "
+                f"least {self.min_docs} documents; lower min_docs"
+            )
+        dictionary, corpus = self._get_corpus()
+
+        base_model = self.train_base_model(num_passes=base_passes, num_topics=num_topics)
+        # Plain LdaModel for the slices: parallelism comes from the slices,
+        # so each slice model must not start its own worker processes
+        base_state = LdaModel(
+            id2word=dictionary, num_topics=num_topics, random_state=42
+        )
+        base_state.state = base_model.state
+        base_state.sync_state()
+        # Continue the online learning rate schedule of the base model, so
+        # that the first slice chunk refines the base topics instead of
+        # replacing them
+        base_state.num_updates = base_model.num_updates
+        reference = base_model.get_topics()
+
+        rows = []
+        with self.metrics.stage(
+            "train_slices", rows=sum(map(len, slices.values())), logger=self.logger
+        ):
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.num_processors,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=LoggerConfig.configure_worker,
+                initargs=(LoggerConfig.get_worker_queue(),),
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        train_slice,
+                        base_state,
+                        [corpus[index] for index in indexes],
+                        slice_passes,
+                        num_words,
+                    ): period
+                    for period, indexes in slices.items()
+                }
+                results = {}
+                for future in concurrent.futures.as_completed(futures):
+                    period = futures[future]
+                    results[period] = future.result()
+                    self.logger.info(f"Trained slice {period}")
+
+        with self.metrics.stage("align_topics", rows=len(results), logger=self.logger):
+            for period in slices:
+                result = results[period]
+                matches, similarities = align_topics(reference, result["topics"])
+                for topic_id, (match, similarity) in enumerate(
+                    zip(matches, similarities)
+                ):
+                    rows.append(
+                        {
+                            "period": str(period),
+                            "topic": topic_id,
+                            "documents": len(slices[period]),
+                            "prevalence": float(result["prevalence"][match]),
+                            "similarity": float(similarity),
+                            "terms": " ".join(result["terms"][match]),
+                        }
+                    )
+
+        evolution_df = pd.DataFrame(rows)
+
+        # Save the DataFrame to a SQLite database if requested
+        if self.save_db_path:
+            manager = DatabaseManager(self.save_db_path, logger=self.logger)
+            manager.save_to_db(evolution_df, table_name=self.evolution_table_name)
+            self.logger.info(
+                f"Topic evolution saved to SQLite database: {self.save_db_path}"
+            )
+
+        return evolution_df
+
+
+if __name__ == "__main__":
+    # Get the absolute path of the current directory (e.g., src)
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    main_dir = os.path.abspath(os.path.join(current_dir, "../"))
+
+    # Load the dataframe from the SQLite database
+    connection = sqlite3.connect(f"{main_dir}/data/emails_processed.db")
+    emails_df = pd.read_sql_query("SELECT * FROM emails_processed", connection)
+    connection.close()
+
+    # Quarterly slices, trained on 6 processors
+    topics = DynamicTopicModeling(
+        emails_df,
+        freq="Q",
+        num_processors=6,
+        save_db_path=f"{main_dir}/data/emails_processed.db",
+    )
+    evolution_df = topics.dynamic_topics(num_topics=10)
+
+    print(evolution_df.pivot(index="period", columns="topic", values="prevalence"))
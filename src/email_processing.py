@@ -1,21 +1,23 @@
-import numpy as np
 import pandas as pd
 import sqlite3
 from utils.log_config import LoggerConfig
 from utils.db_manager import DatabaseManager
-import time
-from bs4 import BeautifulSoup
+from utils.metrics import get_metrics, timed_stage
+from utils.memory import optimize_dtypes
 import re
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
 from datetime import datetime
 
+# nltk and BeautifulSoup are imported where they are used, so that loading
+# data or importing this module for a lookup does not pay for them
+
 
 class EmailProcessing:
-    def __init__(self):
+    def __init__(self, metrics=None, lean=False):
         self.logger = LoggerConfig(logger_name="EmailProcessing").get_logger()
-        self.data_saver = DatabaseManager(self.logger)
+        self.metrics = metrics or get_metrics()
+        # Memory-lean mode: work on the input DataFrame instead of a copy,
+        # drop the raw text once extracted and use compact dtypes
+        self.lean = lean
 
     def load_data(self, db_path, table_name):
         connection = sqlite3.connect(db_path)
@@ -28,6 +30,8 @@ class EmailProcessing:
         if pd.notnull(text):  # Ensure text is not NaN
             # Use BeautifulSoup only if the text looks like HTML
             if "<" in text and ">" in text:
+                from bs4 import BeautifulSoup
+
                 text = BeautifulSoup(text, "html.parser").get_text()
             # Remove email addresses
             text = re.sub(r"\S+@\S+", "", text)
@@ -48,9 +52,40 @@ class EmailProcessing:
         text = re.sub(r"[^a-z\s]", "", text)
         return text
 
+    def tokenize_text(self, text):
+        """
+        Apply the `process_data` text steps to a single email body.
+
+        Extraction, normalization, tokenization, stop word removal and stemming
+        are the same as in `process_data`, so that new emails (e.g. sent to the
+        topic inference service) match the tokens the model was trained on.
+
+        Parameters:
+            text (str): The email body.
+
+        Returns:
+            list: The stemmed tokens.
+        """
+        from nltk.tokenize import word_tokenize
+        from nltk.corpus import stopwords
+        from nltk.stem import PorterStemmer
+
+        # The stop words and stemmer are loaded once per instance
+        if not hasattr(self, "_stop_words"):
+            self._stop_words = set(stopwords.words("english"))
+            self._stemmer = PorterStemmer()
+
+        text = self.text_normalize(self.text_extract(text))
+        return [
+            self._stemmer.stem(word)
+            for word in word_tokenize(text)
+            if word not in self._stop_words
+        ]
+
+    @timed_stage("format_date", rows=len)
     def format_date(self, df):
         # Copy the dataframe to avoid modifying the original data
-        emails_df = df.copy()
+        emails_df = df if self.lean else df.copy()
 
         # Identify non-matching rows
         non_matching = emails_df[
@@ -83,82 +118,64 @@ class EmailProcessing:
     def process_data(
         self, df, save_csv_path=None, save_db_path=None, table_name="emails_processed"
     ):
-        self.logger.info(f"Pre-processing data")
-        start_proc = time.time()
-        emails_df = df.copy()
-
-        # Text extraction
-        start_extraction = time.time()
-        self.logger.info(f"Starting text extraction")
-        emails_df["processed_text"] = emails_df["text"].apply(self.text_extract)
-        end_extraction = time.time()
-        self.logger.info(
-            f"Completed text extraction in {end_extraction - start_extraction:.2f} s"
-        )
-
-        # Text normalization
-        start_normalization = time.time()
-        self.logger.info(f"Starting text normalization")
-        emails_df["processed_text"] = emails_df["processed_text"].apply(
-            self.text_normalize
-        )
-        end_normalization = time.time()
-        self.logger.info(
-            f"Completed normalization in {end_normalization - start_normalization:.2f} s"
-        )
+        from nltk.tokenize import word_tokenize
+        from nltk.corpus import stopwords
+        from nltk.stem import PorterStemmer
+
+        with self.metrics.stage("process_data", rows=len(df), logger=self.logger):
+            emails_df = df if self.lean else df.copy()
+            rows = len(emails_df)
+
+            # Text extraction
+            with self.metrics.stage("text_extract", rows=rows, logger=self.logger):
+                emails_df["processed_text"] = emails_df["text"].apply(self.text_extract)
+                if self.lean:
+                    # The raw text is the largest column and no longer needed
+                    emails_df.drop(columns="text", inplace=True)
+
+            # Text normalization
+            with self.metrics.stage("text_normalize", rows=rows, logger=self.logger):
+                emails_df["processed_text"] = emails_df["processed_text"].apply(
+                    self.text_normalize
+                )
 
-        # Tokenization splits the text into individual words (tokens)
-        start_token = time.time()
-        self.logger.info(f"Starting tokenization")
-        emails_df["tokens"] = emails_df["processed_text"].apply(word_tokenize)
-        end_token = time.time()
-        self.logger.info(f"Completed tokenization in {end_token - start_token:.2f} s")
+            # Tokenization splits the text into individual words (tokens)
+            with self.metrics.stage("tokenize", rows=rows, logger=self.logger):
+                emails_df["tokens"] = emails_df["processed_text"].apply(word_tokenize)
 
-        # Filter out common stop words that don’t carry significant meaning for topic modeling.
-        start_stopwords = time.time()
-        stop_words = set(stopwords.words("english"))
+            # Filter out common stop words that don’t carry significant meaning for topic modeling.
+            with self.metrics.stage("remove_stopwords", rows=rows, logger=self.logger):
+                stop_words = set(stopwords.words("english"))
 
-        emails_df["tokens"] = emails_df["tokens"].apply(
-            lambda x: [word for word in x if word not in stop_words]
-        )
-        end_stopwords = time.time()
-        self.logger.info(
-            f"Completed stop word removal in {end_stopwords - start_stopwords:.2f} s"
-        )
+                emails_df["tokens"] = emails_df["tokens"].apply(
+                    lambda x: [word for word in x if word not in stop_words]
+                )
 
-        # Stemming reduces words to their root form, which helps to group similar words
-        start_stem = time.time()
-        self.logger.info(f"Starting stemming")
-        stemmer = PorterStemmer()
-        emails_df["tokens"] = emails_df["tokens"].apply(
-            lambda x: [stemmer.stem(word) for word in x]
-        )
-        end_stem = time.time()
-        self.logger.info(f"Completed stemming in {end_stem - start_stem:.2f} s")
-
-        # Format the date to standard date time
-        start_date = time.time()
-        self.logger.info(f"Formatting date")
-        emails_df = self.format_date(emails_df)
-        end_date = time.time()
-        self.logger.info(f"Completed date formatting in {end_date - start_date:.2f} s")
-
-        # Save the DataFrame to a CSV file if requested
-        if save_csv_path:
-            manager = DatabaseManager(save_csv_path)
-            manager.save_to_csv(emails_df)
-            self.logger.info(f"Preprocessed data saved to CSV file: {save_csv_path}")
-
-        # Save the DataFrame to a SQLite database if requested
-        if save_db_path:
-            manager = DatabaseManager(save_db_path)
-            manager.save_to_db(emails_df, table_name)
-            self.logger.info(
-                f"Preprocessed data saved to SQLite database: {save_db_path}"
-            )
+            # Stemming reduces words to their root form, which helps to group similar words
+            with self.metrics.stage("stem", rows=rows, logger=self.logger):
+                stemmer = PorterStemmer()
+                emails_df["tokens"] = emails_df["tokens"].apply(
+                    lambda x: [stemmer.stem(word) for word in x]
+                )
 
-        end_proc = time.time()
-        self.logger.info(f"Completed preprocessing in {end_proc - start_proc:.2f} s")
+            # Format the date to standard date time
+            emails_df = self.format_date(emails_df)
+            if self.lean:
+                optimize_dtypes(emails_df, logger=self.logger)
+
+            # Save the DataFrame to a CSV file if requested
+            if save_csv_path:
+                manager = DatabaseManager(save_csv_path, logger=self.logger)
+                manager.save_to_csv(emails_df, save_csv_path)
+                self.logger.info(f"Preprocessed data saved to CSV file: {save_csv_path}")
+
+            # Save the DataFrame to a SQLite database if requested
+            if save_db_path:
+                manager = DatabaseManager(save_db_path, logger=self.logger)
+                manager.save_to_db(emails_df, table_name)
+                self.logger.info(
+                    f"Preprocessed data saved to SQLite database: {save_db_path}"
+                )
 
         # New information
         self.logger.info(
@@ -0,0 +1,374 @@
+import os
+import abc
+import array
+import pickle
+import numpy as np
+import pandas as pd
+
+
+class TopicEngine(abc.ABC):
+    """
+    Common interface of the topic model backends used by `TopicModeling`.
+
+    An engine is fitted on a gensim dictionary and BoW corpus and exposes the
+    same outputs whatever the backend:
+
+    - `components_`: topics x terms weights, like scikit-learn models, so
+      that `EmailProcessing.list_top_topics(engine, engine.feature_names, n)`
+      works for every engine.
+    - `document_topics`: normalized document-topic weights.
+    - `dominant_topics` and `ranked_topics`: the dominant topic per email and
+      the ranked topic table written to the `topics` table.
+
+    Subclasses must implement `fit`, `_document_topics` and `components_`;
+    an incomplete engine cannot be instantiated.
+
+    Attributes:
+        name (str): Short name of the engine, e.g. "lda" or "nmf".
+        num_topics (int): Number of topics.
+        dictionary (gensim.corpora.Dictionary): The dictionary, set by `fit`.
+    """
+
+    name = None
+
+    def __init__(self, num_topics=10):
+        self.num_topics = num_topics
+        self.dictionary = None
+
+    @abc.abstractmethod
+    def fit(self, dictionary, corpus):
+        """
+        Train the engine.
+
+        Parameters:
+            dictionary (gensim.corpora.Dictionary): The dictionary of the corpus.
+            corpus (list): BoW documents.
+
+        Returns:
+            TopicEngine: The fitted engine.
+        """
+
+    @property
+    @abc.abstractmethod
+    def components_(self):
+        """Topic-term weights, topics x terms."""
+
+    @abc.abstractmethod
+    def _document_topics(self, corpus):
+        """Unnormalized document-topic weights of a chunk of BoW documents."""
+
+    @property
+    def feature_names(self):
+        """Terms in the order of the columns of `components_`."""
+        return [self.dictionary[index] for index in range(len(self.dictionary))]
+
+    def iter_document_topics(self, corpus, chunksize=2000):
+        """
+        Yield normalized document-topic weights chunk by chunk.
+
+        Parameters:
+            corpus (list): BoW documents.
+            chunksize (int): Number of documents per chunk. Defaults to 2000.
+
+        Yields:
+            np.ndarray: Weights of a chunk of documents, documents x topics.
+        """
+        for start in range(0, len(corpus), chunksize):
+            weights = self._document_topics(corpus[start : start + chunksize])
+            totals = weights.sum(axis=1, keepdims=True)
+            # Empty documents have no weight on any topic
+            totals[totals == 0] = 1.0
+            yield weights / totals
+
+    def document_topics(self, corpus):
+        """
+        Normalized document-topic weights.
+
+        Parameters:
+            corpus (list): BoW documents.
+
+        Returns:
+            np.ndarray: Weights, documents x topics.
+        """
+        return np.vstack(list(self.iter_document_topics(corpus)))
+
+    def dominant_topics(self, corpus):
+        """
+        Dominant topic of each document.
+
+        Parameters:
+            corpus (list): BoW documents.
+
+        Returns:
+            list: Topic id per document.
+        """
+        dominant_topics = []
+        for weights in self.iter_document_topics(corpus):
+            dominant_topics.extend(weights.argmax(axis=1).tolist())
+        return dominant_topics
+
+    def top_terms(self, num_words=10):
+        """
+        Top terms of each topic with their weights (normalized per topic).
+
+        Parameters:
+            num_words (int): Number of terms per topic. Defaults to 10.
+
+        Returns:
+            list: Per topic, a list of (term, weight) sorted by weight.
+        """
+        components = self.components_
+        totals = components.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        components = components / totals
+        top_terms = []
+        for topic in components:
+            indexes = topic.argsort()[: -num_words - 1 : -1]
+            top_terms.append([(self.dictionary[i], float(topic[i])) for i in indexes])
+        return top_terms
+
+    def ranked_topics(self, corpus, num_words=10):
+        """
+        Topics ranked by importance, in the layout of the `topics` table.
+
+        Parameters:
+            corpus (list): BoW documents.
+            num_words (int): Number of terms per topic. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: Columns Topic, Importance, Terms and, for each term,
+            "Term i" and "Term i Weight", sorted by importance.
+        """
+        # Importance: mean topic weight over the documents
+        importance = np.zeros(self.num_topics)
+        for weights in self.iter_document_topics(corpus):
+            importance += weights.sum(axis=0)
+        importance /= max(len(corpus), 1)
+
+        ranked_topics_data = []
+        for topic_id, terms in enumerate(self.top_terms(num_words)):
+            row = {
+                "Topic": topic_id,
+                "Importance": float(importance[topic_id]),
+                "Terms": " + ".join(f'{weight:.3f}*"{term}"' for term, weight in terms),
+            }
+            for i, (term, weight) in enumerate(terms, start=1):
+                row[f"Term {i}"] = term
+                row[f"Term {i} Weight"] = weight
+            ranked_topics_data.append(row)
+
+        ranked_topics_df = pd.DataFrame(ranked_topics_data).sort_values(
+            by="Importance", ascending=False
+        )
+        ranked_topics_df.reset_index(inplace=True, drop=True)
+        return ranked_topics_df
+
+    def save(self, save_model_path):
+        """
+        Save the fitted engine.
+
+        Parameters:
+            save_model_path (str): Directory of the saved models.
+
+        Returns:
+            str: Path of the saved model.
+        """
+        path = f"{save_model_path}/{self.name}.pkl"
+        with open(path, "wb") as file:
+            pickle.dump(self, file)
+        return path
+
+
+class LdaTopicEngine(TopicEngine):
+    """
+    gensim `LdaMulticore` backend, also behind `TopicModeling.train_lda_model`.
+
+    Attributes:
+        num_passes (int): Number of passes over the corpus. Defaults to 10.
+        workers (int): Number of worker processes. Defaults to 1.
+        lda_model (gensim.models.LdaMulticore): The fitted model.
+    """
+
+    name = "lda"
+
+    def __init__(self, num_topics=10, num_passes=10, workers=1):
+        super().__init__(num_topics)
+        self.num_passes = num_passes
+        self.workers = workers
+        self.lda_model = None
+
+    def fit(self, dictionary, corpus):
+        from gensim.models import LdaMulticore
+
+        self.dictionary = dictionary
+        self.lda_model = LdaMulticore(
+            corpus=corpus,
+            id2word=dictionary,
+            num_topics=self.num_topics,
+            passes=self.num_passes,
+            random_state=42,
+            workers=self.workers,
+        )
+        return self
+
+    @property
+    def components_(self):
+        return self.lda_model.get_topics()
+
+    def _document_topics(self, corpus):
+        # One batched variational E-step per chunk
+        gamma, _ = self.lda_model.inference(corpus)
+        return gamma
+
+    def save(self, save_model_path):
+        path = f"{save_model_path}/lda.model"
+        self.lda_model.save(path)
+        self.dictionary.save(f"{save_model_path}/lda.dict")
+        return path
+
+
+class NmfTopicEngine(TopicEngine):
+    """
+    Sparse TF-IDF + MiniBatch NMF backend for large corpora.
+
+    The TF-IDF matrix is built as a CSR matrix straight from the BoW corpus,
+    with the inverse document frequencies of the dictionary, so no text is
+    re-tokenized and no dense matrix is ever created; only the sparse matrix
+    is held in memory. `MiniBatchNMF` then updates the topics once per
+    mini-batch of `batch_size` documents, for `num_passes` passes over the
+    matrix, so each pass makes many cheap updates instead of a single
+    full-batch one.
+
+    Attributes:
+        num_passes (int): Number of passes over the TF-IDF matrix. Defaults to 5.
+        batch_size (int): Number of documents per mini-batch update. Defaults to 2048.
+        sublinear_tf (bool): Use 1 + log(tf) instead of raw counts. Defaults to True.
+        random_state (int): Seed for the initialization. Defaults to 42.
+        nmf_model (sklearn.decomposition.MiniBatchNMF): The fitted model.
+    """
+
+    name = "nmf"
+
+    def __init__(
+        self,
+        num_topics=10,
+        num_passes=5,
+        batch_size=2048,
+        sublinear_tf=True,
+        random_state=42,
+    ):
+        super().__init__(num_topics)
+        self.num_passes = num_passes
+        self.batch_size = batch_size
+        self.sublinear_tf = sublinear_tf
+        self.random_state = random_state
+        self.idf = None
+        self.nmf_model = None
+
+    def tfidf_matrix(self, corpus):
+        """
+        Build the L2-normalized TF-IDF matrix of a BoW corpus.
+
+        Parameters:
+            corpus (iterable): BoW documents, e.g. a list or a `BowStream`.
+
+        Returns:
+            scipy.sparse.csr_matrix: TF-IDF weights, documents x terms.
+        """
+        from scipy.sparse import csr_matrix
+        from sklearn.preprocessing import normalize
+
+        # Compact typed buffers instead of lists of Python ints and floats
+        indptr = array.array("q", [0])
+        indices = array.array("i")
+        data = array.array("f")
+        for bow in corpus:
+            for term_id, count in bow:
+                indices.append(term_id)
+                data.append(count)
+            indptr.append(len(indices))
+
+        matrix = csr_matrix(
+            (
+                np.frombuffer(data, dtype=np.float32),
+                np.frombuffer(indices, dtype=np.int32),
+                np.frombuffer(indptr, dtype=np.int64),
+            ),
+            shape=(len(indptr) - 1, len(self.dictionary)),
+        )
+        if self.sublinear_tf:
+            np.log(matrix.data, out=matrix.data)
+            matrix.data += 1.0
+        matrix.data *= self.idf[matrix.indices]
+        return normalize(matrix, norm="l2", copy=False)
+
+    def fit(self, dictionary, corpus):
+        from sklearn.decomposition import MiniBatchNMF
+
+        self.dictionary = dictionary
+        # Smoothed inverse document frequencies, as in scikit-learn
+        dfs = np.zeros(len(dictionary), dtype=np.float32)
+        for term_id, df in dictionary.dfs.items():
+            dfs[term_id] = df
+        self.idf = np.log((1 + dictionary.num_docs) / (1 + dfs)) + 1.0
+
+        tfidf = self.tfidf_matrix(corpus)
+        # One pass (max_iter) is one update per mini-batch of the matrix
+        self.nmf_model = MiniBatchNMF(
+            n_components=self.num_topics,
+            batch_size=self.batch_size,
+            max_iter=self.num_passes,
+            init="nndsvda",
+            random_state=self.random_state,
+        )
+        self.nmf_model.fit(tfidf)
+        return self
+
+    @property
+    def components_(self):
+        return self.nmf_model.components_
+
+    def _document_topics(self, corpus):
+        return self.nmf_model.transform(self.tfidf_matrix(corpus))
+
+
+# Available engines by name
+ENGINES = {
+    LdaTopicEngine.name: LdaTopicEngine,
+    NmfTopicEngine.name: NmfTopicEngine,
+}
+
+
+def get_engine(name, **kwargs):
+    """
+    Create a topic engine by name.
+
+    Parameters:
+        name (str): The engine name, see `ENGINES`.
+        **kwargs: Arguments of the engine class.
+
+    Returns:
+        TopicEngine: The (unfitted) engine.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown topic engine: {name} (available: {sorted(ENGINES)})")
+    return ENGINES[name](**kwargs)
+
+
+if __name__ == "__main__":
+    from email_processing import EmailProcessing
+    from utils.vocabulary import TokenStream, VocabularyBuilder, BowStream
+
+    # Get the absolute path of the current directory (e.g., src)
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    main_dir = os.path.abspath(os.path.join(current_dir, "../"))
+
+    # Stream the tokens straight from the processed emails database
+    tokens = TokenStream(f"{main_dir}/data/emails_processed.db")
+    dictionary = VocabularyBuilder().build(tokens)
+    corpus = list(BowStream(tokens, dictionary))
+
+    # Train the NMF engine and list its topics like a scikit-learn model
+    engine = get_engine("nmf", num_topics=10).fit(dictionary, corpus)
+    EmailProcessing().list_top_topics(engine, engine.feature_names, 10)
+    print(engine.ranked_topics(corpus))
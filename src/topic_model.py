@@ -1,19 +1,15 @@
-import numpy as np
 import pandas as pd
 import sqlite3
 from utils.log_config import LoggerConfig
 from utils.db_manager import DatabaseManager
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime
-import time
-from gensim.corpora import Dictionary
-from gensim.models import LdaModel, LdaMulticore
-from gensim.models.coherencemodel import CoherenceModel
-import pyLDAvis
-import pyLDAvis.gensim_models as gensimvis
+from utils.metrics import get_metrics, timed_stage
+from utils.vocabulary import VocabularyBuilder, BowStream, parse_tokens
+from topic_engines import TopicEngine, get_engine
 import os
 
+# gensim and pyLDAvis take seconds to import, so they are imported in the
+# methods that need them rather than when this module is loaded
+
 
 class TopicModeling:
     def __init__(
@@ -23,148 +19,170 @@ class TopicModeling:
         save_csv_path=None,
         save_db_path=None,
         topics_table_name="topics",
+        metrics=None,
+        lean=False,
+        no_below=5,
+        no_above=0.5,
+        keep_n=100000,
+        engine="lda",
+        tokens=None,
     ):
         self.logger = LoggerConfig(logger_name="TopicModeling").get_logger()
-        self.data_saver = DatabaseManager(self.logger)
+        self.metrics = metrics or get_metrics()
+        # Memory-lean mode: add results to `df` instead of a copy
+        self.lean = lean
         # DataFrame
         self.df = df
-        self.df["tokens"] = self.df["tokens"].apply(lambda x: x.split())
+        # Token lists for the vocabulary, corpus and coherence: a re-iterable
+        # stream such as a `TokenStream` over the processed emails table, so
+        # the parsed tokens are never all in memory, or else the parsed
+        # "tokens" column of the DataFrame. With a stream, the DataFrame only
+        # needs a "rowid" column, by which the dominant topics are written back
+        if tokens is None:
+            self.df["tokens"] = self.df["tokens"].apply(parse_tokens)
+            tokens = self.df["tokens"]
+        self.tokens = tokens
         # Number of processors
         self.num_processors = num_processors
+        # Vocabulary limits: min/max document frequency and top-K tokens
+        self.no_below = no_below
+        self.no_above = no_above
+        self.keep_n = keep_n
+        # Topic engine: "lda" (gensim LdaMulticore) or "nmf" (TF-IDF + MiniBatch NMF)
+        self.engine = engine
+        # Dictionary and corpus, built once and shared by the later steps
+        self._dictionary = None
+        self._corpus = None
 
         self.save_csv_path = save_csv_path
         self.save_db_path = save_db_path
         self.topics_table_name = topics_table_name
 
+    @timed_stage("create_corpus", rows=lambda result: len(result[1]))
     def create_corpus(self):
-
-        emails_df = self.df.copy()
-
-        # Create a dictionary and a corpus
-        dictionary = Dictionary(emails_df["tokens"])
-        corpus = [dictionary.doc2bow(tokens) for tokens in emails_df["tokens"]]
-
-        return dictionary, corpus
-
-    def train_lda_model(self, num_passes=10, num_topics=10):
-        dictionary, corpus = self.create_corpus()
-        lda_model = LdaMulticore(
-            corpus=corpus,
-            id2word=dictionary,
-            num_topics=num_topics,
-            passes=num_passes,
-            random_state=42,
-            workers=self.num_processors,
+        # Build a pruned dictionary (read-only, so no copy of the DataFrame)
+        builder = VocabularyBuilder(
+            no_below=self.no_below,
+            no_above=self.no_above,
+            keep_n=self.keep_n,
+            logger=self.logger,
         )
-        return lda_model
+        dictionary = builder.build(self.tokens)
+        # Create the corpus over the kept tokens only. It is kept as a list:
+        # the engines and the time slices address documents by position
+        corpus = list(BowStream(self.tokens, dictionary))
 
-    def coherence_score(self, dictionary, lda_model):
+        return dictionary, corpus
 
-        emails_df = self.df.copy()
+    def _get_corpus(self):
+        """Return the dictionary and corpus, creating them on first use."""
+        if self._corpus is None:
+            self._dictionary, self._corpus = self.create_corpus()
+        return self._dictionary, self._corpus
 
-        coherence_model_lda = CoherenceModel(
-            model=lda_model,
-            texts=emails_df["tokens"],
-            dictionary=dictionary,
-            coherence="c_v",
-            processes=self.num_processors,
+    def train_lda_model(self, num_passes=10, num_topics=10):
+        # The gensim model of the LDA engine
+        topic_engine, _ = self.train_engine(num_passes, num_topics, engine="lda")
+        return topic_engine.lda_model
+
+    def train_engine(self, num_passes=10, num_topics=10, engine=None):
+        """
+        Train a topic engine on the shared dictionary and corpus.
+
+        Parameters:
+            num_passes (int): Number of passes over the corpus. Defaults to 10.
+            num_topics (int): Number of topics. Defaults to 10.
+            engine (str): Engine name, see `topic_engines.ENGINES`. Defaults to `self.engine`.
+
+        Returns:
+            TopicEngine: The fitted engine.
+            StageTimer: The measurements of the training stage.
+        """
+        engine_name = engine or self.engine
+        options = {"num_topics": num_topics, "num_passes": num_passes}
+        if engine_name == "lda":
+            options["workers"] = self.num_processors
+        topic_engine = get_engine(engine_name, **options)
+
+        dictionary, corpus = self._get_corpus()
+        self.logger.info(
+            f"Training {engine_name.upper()} engine with {num_topics} topics and {num_passes} passes"
         )
-
-        # Calculate coherence score
-        coherence_score = coherence_model_lda.get_coherence()
-
-        return coherence_score
-
-    def record_dominant_topic(self, lda_model, corpus):
-        dominant_topics = []
-        for doc_bow in corpus:
-            topic_probs = lda_model.get_document_topics(doc_bow)
-            dominant_topic = max(topic_probs, key=lambda x: x[1])[0]
-            dominant_topics.append(dominant_topic)
-        return dominant_topics
-
-    def topic_distribution(self, corpus, lda_model, num_words=10):
-
-        # Step 1: Calculate topic importance (weights)
-        topic_importance = [0] * lda_model.num_topics
-        for doc in corpus:
-            for topic_id, weight in lda_model[doc]:
-                topic_importance[topic_id] += weight
-        topic_importance = [
-            weight / len(corpus) for weight in topic_importance
-        ]  # Normalize by number of documents
-
-        # Step 2: Combine importance and terms into a DataFrame
-        ranked_topics_data = []
-
-        for topic_id, importance in enumerate(topic_importance):
-            topic_terms = lda_model.print_topic(topic_id, topn=num_words)
-            ranked_topics_data.append(
-                {"Topic": topic_id, "Importance": importance, "Terms": topic_terms}
+        with self.metrics.stage(
+            f"train_{engine_name}_model", rows=len(corpus), logger=self.logger
+        ) as timer:
+            topic_engine.fit(dictionary, corpus)
+        return topic_engine, timer
+
+    def coherence_score(self, dictionary, model):
+        from gensim.models.coherencemodel import CoherenceModel
+
+        # Topic engines, LDA included, are scored on their top terms per topic,
+        # so that all engines are compared alike; gensim models are passed as is
+        if isinstance(model, TopicEngine):
+            model_options = {
+                "topics": [
+                    [term for term, _ in terms]
+                    for terms in model.top_terms(num_words=20)
+                ]
+            }
+        else:
+            model_options = {"model": model}
+
+        with self.metrics.stage("coherence_score", rows=len(self.df), logger=self.logger):
+            coherence_model_lda = CoherenceModel(
+                **model_options,
+                texts=self.tokens,
+                dictionary=dictionary,
+                coherence="c_v",
+                processes=self.num_processors,
             )
 
-        # Create DataFrame and sort by importance
-        ranked_topics_df = pd.DataFrame(ranked_topics_data).sort_values(
-            by="Importance", ascending=False
-        )
-
-        # Add new columns for each term and weight
-        for i in range(1, num_words + 1):
-            ranked_topics_df[f"Term {i}"] = None
-            ranked_topics_df[f"Term {i} Weight"] = None
+            # Calculate coherence score
+            coherence_score = coherence_model_lda.get_coherence()
 
-        # Populate the new columns with terms and weights
-        for idx, row in ranked_topics_df.iterrows():
-            terms_weights = row["Terms"].split(" + ")
-            for i, term_weight in enumerate(terms_weights):
-                weight, term = term_weight.split("*")
-                ranked_topics_df.at[idx, f"Term {i+1}"] = term.strip("'\",")
-                ranked_topics_df.at[idx, f"Term {i+1} Weight"] = float(weight)
-
-        ranked_topics_df.reset_index(inplace=True, drop=True)
-        return ranked_topics_df
+        return coherence_score
 
     def topic_model(self, num_passes=10, num_topics=10):
-        emails_df = self.df.copy()
+        emails_df = self.df if self.lean else self.df.copy()
 
         # Create corpus
-        dictionary, corpus = self.create_corpus()
+        dictionary, corpus = self._get_corpus()
 
-        # Train LDA model
-        start_training = time.time()
-        self.logger.info(
-            f"Training LDA model with {num_topics} topics and {num_passes} passes"
-        )
-        lda_model = self.train_lda_model(num_passes, num_topics)
-        end_training = time.time()
-        self.logger.info(f"Trained LDA model in {end_training - start_training:.2f} s")
+        # Train the topic engine (LDA by default)
+        topic_engine, _ = self.train_engine(num_passes, num_topics)
 
         # Get coherence score
-        start_coherence = time.time()
-        self.logger.info(f"Calculating coherence score")
-        coherence_score = self.coherence_score(dictionary, lda_model)
+        coherence_score = self.coherence_score(dictionary, topic_engine)
         self.logger.info(f"Coherence Score: {coherence_score}")
-        end_coherence = time.time()
-        self.logger.info(
-            f"Calculated coherence score in {end_coherence - start_coherence:.2f} s"
-        )
 
         # Record dominant topic number for each email
         self.logger.info(f"Recording dominant topic number to processed email database")
-        emails_df["dominant_topic"] = self.record_dominant_topic(lda_model, corpus)
+        with self.metrics.stage("record_dominant_topic", rows=len(corpus), logger=self.logger):
+            emails_df["dominant_topic"] = topic_engine.dominant_topics(corpus)
 
         # Save the DataFrame to a CSV file if requested
         if self.save_csv_path:
-            manager = DatabaseManager(self.save_csv_path)
-            manager.save_to_csv(emails_df)
+            manager = DatabaseManager(self.save_csv_path, logger=self.logger)
+            manager.save_to_csv(emails_df, self.save_csv_path)
             self.logger.info(
-                f"Email data and dominant topics saved to CSV file: {save_csv_path}"
+                f"Email data and dominant topics saved to CSV file: {self.save_csv_path}"
             )
 
         # Save the DataFrame to a SQLite database if requested
         if self.save_db_path:
-            manager = DatabaseManager(self.save_db_path)
-            manager.save_to_db(emails_df, table_name="emails_processed")
+            manager = DatabaseManager(self.save_db_path, logger=self.logger)
+            if "tokens" in emails_df.columns:
+                manager.save_to_db(emails_df, table_name="emails_processed")
+            else:
+                # Streamed tokens: the DataFrame only has the rowids, so only
+                # the new column is written and the tokens stay in the table
+                manager.update_column(
+                    getattr(self.tokens, "table_name", "emails_processed"),
+                    "dominant_topic",
+                    emails_df["dominant_topic"],
+                    emails_df["rowid"],
+                )
             self.logger.info(
                 f"Email data and dominant topics saved to SQLite database: {self.save_db_path}"
             )
@@ -173,19 +191,20 @@ class TopicModeling:
         self.logger.info(
             f"Formulating DataFrame with ranked topics and weights each word"
         )
-        ranked_topics_df = self.topic_distribution(corpus, lda_model, num_words=10)
+        with self.metrics.stage("topic_distribution", rows=len(corpus), logger=self.logger):
+            ranked_topics_df = topic_engine.ranked_topics(corpus, num_words=10)
 
         # Save the DataFrame to a CSV file if requested
         if self.save_csv_path:
-            manager = DatabaseManager(self.save_csv_path)
-            manager.save_to_csv(ranked_topics_df)
+            manager = DatabaseManager(self.save_csv_path, logger=self.logger)
+            manager.save_to_csv(ranked_topics_df, self.save_csv_path)
             self.logger.info(
                 f"Ranked topics with words and corresponding weights saved to CSV file: {self.save_csv_path}"
             )
 
         # Save the DataFrame to a SQLite database if requested
         if self.save_db_path:
-            manager = DatabaseManager(self.save_db_path)
+            manager = DatabaseManager(self.save_db_path, logger=self.logger)
             manager.save_to_db(ranked_topics_df, table_name=self.topics_table_name)
             self.logger.info(
                 f"Ranked topics with words and corresponding weights saved to SQLite database: {self.save_db_path}"
@@ -201,19 +220,67 @@ class TopicModeling:
 
         path_models = f"{root_dir}/data/models"
 
-        # Visualize with pyLDAvis
-        self.visualize_topics(lda_model, save_model_path=f"{path_models}")
+        if topic_engine.name == "lda":
+            # Visualize with pyLDAvis
+            self.visualize_topics(topic_engine.lda_model, save_model_path=f"{path_models}")
+        else:
+            # pyLDAvis only supports gensim LDA models, so just save the engine
+            model_path = topic_engine.save(path_models)
+            self.logger.info(f"{topic_engine.name.upper()} model saved to: {model_path}")
 
         return emails_df, ranked_topics_df
 
+    def compare_engines(self, engines=("lda", "nmf"), num_passes=10, num_topics=10):
+        """
+        Train several topic engines on the same corpus and compare them.
+
+        Parameters:
+            engines (tuple): Engine names. Defaults to ("lda", "nmf").
+            num_passes (int): Number of passes of each engine. Defaults to 10.
+            num_topics (int): Number of topics. Defaults to 10.
+
+        Returns:
+            pd.DataFrame: One row per engine with the training wall time,
+            throughput (documents/s), peak RSS, coherence score and the
+            share of emails whose dominant topic is the largest topic.
+        """
+        dictionary, corpus = self._get_corpus()
+
+        comparison = []
+        for engine_name in engines:
+            topic_engine, timer = self.train_engine(
+                num_passes, num_topics, engine=engine_name
+            )
+            dominant_topics = pd.Series(topic_engine.dominant_topics(corpus))
+            comparison.append(
+                {
+                    "engine": engine_name,
+                    "train_time_s": timer.wall_time_s,
+                    "docs_per_s": timer.rows_per_s,
+                    "peak_rss_mb": timer.peak_rss_mb,
+                    "coherence": self.coherence_score(dictionary, topic_engine),
+                    "largest_topic_share": dominant_topics.value_counts(normalize=True).max(),
+                }
+            )
+
+        comparison_df = pd.DataFrame(comparison)
+        self.logger.info(f"Topic engine comparison:\n{comparison_df}")
+        return comparison_df
+
     def visualize_topics(self, lda_model, save_model_path):
+        import pyLDAvis
+        import pyLDAvis.gensim_models as gensimvis
+
         # Create corpus and dictionary
-        dictionary, corpus = self.create_corpus()
+        dictionary, corpus = self._get_corpus()
 
         # Save model
         if save_model_path:
             lda_model.save(f"{save_model_path}/lda.model")
             self.logger.info(f"LDA model saved to: {save_model_path}/lda.model")
+            # The pruned dictionary is needed to convert new emails to BoW
+            dictionary.save(f"{save_model_path}/lda.dict")
+            self.logger.info(f"Dictionary saved to: {save_model_path}/lda.dict")
 
         # Visualize
         vis = gensimvis.prepare(lda_model, corpus, dictionary)
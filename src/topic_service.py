@@ -0,0 +1,493 @@
+import os
+import json
+import time
+import queue
+import threading
+import collections
+import concurrent.futures
+import http.server
+from utils.log_config import LoggerConfig
+
+
+class LoadedModel:
+    """
+    An LDA model and its dictionary, loaded once and kept warm for inference.
+
+    Attributes:
+        version (str): Name of the model version, e.g. "2024-11-01" or "v2".
+        model_path (str): Path of the saved gensim LDA model.
+        lda_model (gensim.models.LdaModel): The loaded model.
+        dictionary (gensim.corpora.Dictionary): Dictionary used to convert tokens to BoW.
+    """
+
+    def __init__(self, version, model_path, dictionary_path=None):
+        from gensim.corpora import Dictionary
+        from gensim.models import LdaModel
+
+        self.version = version
+        self.model_path = model_path
+        self.lda_model = LdaModel.load(model_path)
+        # Prefer the dictionary saved next to the model, else the model's own id2word
+        dictionary_path = dictionary_path or os.path.splitext(model_path)[0] + ".dict"
+        if os.path.exists(dictionary_path):
+            self.dictionary = Dictionary.load(dictionary_path)
+        else:
+            self.dictionary = self.lda_model.id2word
+
+
+class TopicInferenceService:
+    """
+    Local topic inference over saved LDA models with micro-batching.
+
+    Requests are queued and a single background thread groups them into
+    batches of up to `max_batch_size` emails, waiting at most `max_wait_ms`
+    for a batch to fill. Each batch is preprocessed like `process_data` and
+    inferred with one call of the model's variational E-step, which is much
+    cheaper than one `get_document_topics` call per email.
+
+    Several model versions can be loaded at once; `activate` switches between
+    them atomically. Each batch is inferred with the version that is active
+    when the batch is picked up, so no batch mixes versions and no request is
+    dropped during a hot swap.
+
+    `close` stops accepting requests and returns once every queued request
+    has been answered.
+
+    Attributes:
+        max_batch_size (int): Maximum number of emails per batch. Defaults to 64.
+        max_wait_ms (float): Maximum time to wait for a batch to fill. Defaults to 5.
+        minimum_probability (float): Topics below this probability are omitted. Defaults to 0.01.
+        latency_window (int): Number of recent requests kept for latency statistics. Defaults to 10000.
+    """
+
+    def __init__(
+        self,
+        max_batch_size=64,
+        max_wait_ms=5,
+        minimum_probability=0.01,
+        latency_window=10000,
+    ):
+        from email_processing import EmailProcessing
+
+        self.logger = LoggerConfig(logger_name="TopicInferenceService").get_logger()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.minimum_probability = minimum_probability
+
+        self.processing = EmailProcessing()
+        self.models = {}
+        self.active = None
+        self._lock = threading.Lock()
+        self._requests = queue.SimpleQueue()
+        self._latencies = collections.deque(maxlen=latency_window)
+        self._num_batches = 0
+        self._num_requests = 0
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._run, name="topic-inference", daemon=True
+        )
+        self._worker.start()
+
+    def load_model(self, model_path, version=None, dictionary_path=None, activate=True):
+        """
+        Load a saved model version, optionally making it the active version.
+
+        Loading happens outside the lock, so inference keeps running on the
+        current version meanwhile.
+
+        Parameters:
+            model_path (str): Path of the saved gensim LDA model.
+            version (str): Name of the version. Defaults to the model's modification time.
+            dictionary_path (str): Path of the saved dictionary. Defaults to `<model>.dict`.
+            activate (bool): Make this the active version. Defaults to True.
+
+        Returns:
+            str: The version name.
+        """
+        if version is None:
+            version = time.strftime(
+                "%Y%m%d_%H%M%S", time.localtime(os.path.getmtime(model_path))
+            )
+        start_time = time.perf_counter()
+        loaded = LoadedModel(version, model_path, dictionary_path)
+        self.logger.info(
+            f"Loaded model version {version} from {model_path} "
+            f"in {time.perf_counter() - start_time:.2f} s"
+        )
+        with self._lock:
+            self.models[version] = loaded
+        if activate or self.active is None:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """
+        Switch inference to a loaded model version.
+
+        Parameters:
+            version (str): The version name.
+        """
+        with self._lock:
+            if version not in self.models:
+                raise KeyError(f"Model version not loaded: {version}")
+            self.active = self.models[version]
+        self.logger.info(f"Active model version: {version}")
+
+    def unload(self, version):
+        """
+        Release a loaded model version that is not active.
+
+        Parameters:
+            version (str): The version name.
+        """
+        with self._lock:
+            if self.active is not None and self.active.version == version:
+                raise ValueError(f"Cannot unload the active model version: {version}")
+            self.models.pop(version, None)
+
+    def submit(self, text):
+        """
+        Queue one email body for inference.
+
+        Parameters:
+            text (str): The email body.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the topic distribution, a
+            list of (topic id, probability) sorted by probability. Once done,
+            its `version` attribute names the model version that was used.
+
+        Raises:
+            TypeError: If `text` is not a string.
+            RuntimeError: If the service is closed.
+        """
+        if not isinstance(text, str):
+            raise TypeError(f"Email text must be a string, not {type(text).__name__}")
+        future = concurrent.futures.Future()
+        # Under the lock, so that no request is queued after the stop sentinel
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The topic inference service is closed")
+            self._requests.put((text, future, time.perf_counter()))
+        return future
+
+    def infer(self, texts, timeout=None):
+        """
+        Infer the topic distributions of several email bodies.
+
+        Parameters:
+            texts (list): The email bodies.
+            timeout (float): Maximum time to wait in seconds. Optional.
+
+        Returns:
+            list: One topic distribution per email; see `submit`.
+        """
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def _next_batch(self):
+        """Block for the first request, then collect more until the batch is full or the wait is over."""
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # Serve batches until the stop sentinel (None) is dequeued; all
+        # requests were queued before it, so none is left unanswered
+        stopping = False
+        while not stopping:
+            batch = []
+            for request in self._next_batch():
+                if request is None:
+                    stopping = True
+                else:
+                    batch.append(request)
+            if batch:
+                self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        """
+        Infer a batch of queued requests and resolve their futures.
+
+        Parameters:
+            batch (list): The requests, as (text, future, submission time).
+        """
+        # Capture the active version once, so a hot swap never splits a batch
+        with self._lock:
+            loaded = self.active
+        if loaded is None:
+            error = RuntimeError("No model version is loaded")
+            for _, future, _ in batch:
+                future.set_exception(error)
+            return
+
+        # Preprocess each email on its own, so a failing email only
+        # fails its own request and not the rest of the batch
+        bows = []
+        pending = []
+        for text, future, submitted in batch:
+            try:
+                bows.append(
+                    loaded.dictionary.doc2bow(self.processing.tokenize_text(text))
+                )
+            except Exception as error:
+                future.set_exception(error)
+                continue
+            pending.append((future, submitted))
+        if not pending:
+            return
+        try:
+            results = self._infer_batch(loaded, bows)
+        except Exception as error:
+            for future, _ in pending:
+                future.set_exception(error)
+            return
+
+        now = time.perf_counter()
+        for (future, submitted), result in zip(pending, results):
+            self._latencies.append(now - submitted)
+            future.version = loaded.version
+            future.set_result(result)
+        self._num_batches += 1
+        self._num_requests += len(pending)
+
+    def _infer_batch(self, loaded, bows):
+        """
+        Infer a batch of preprocessed emails with one E-step.
+
+        Parameters:
+            loaded (LoadedModel): The model version to use.
+            bows (list): The emails as BoW documents of the model's dictionary.
+
+        Returns:
+            list: One topic distribution per email.
+        """
+        # Rows of gamma are the variational Dirichlet parameters per document
+        gamma, _ = loaded.lda_model.inference(bows)
+        distributions = gamma / gamma.sum(axis=1, keepdims=True)
+
+        results = []
+        for distribution in distributions:
+            topics = [
+                (topic_id, float(probability))
+                for topic_id, probability in enumerate(distribution)
+                if probability >= self.minimum_probability
+            ]
+            topics.sort(key=lambda item: item[1], reverse=True)
+            results.append(topics)
+        return results
+
+    def stats(self):
+        """
+        Latency and throughput statistics of the recent requests.
+
+        Returns:
+            dict: Active version, loaded versions, request and batch counts,
+            mean batch size and p50/p99 latency in milliseconds.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(fraction * len(latencies)))
+            return latencies[index] * 1000
+
+        return {
+            "active_version": self.active.version if self.active else None,
+            "versions": sorted(self.models),
+            "requests": self._num_requests,
+            "batches": self._num_batches,
+            "mean_batch_size": (
+                self._num_requests / self._num_batches if self._num_batches else None
+            ),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+    def close(self):
+        """
+        Stop accepting requests, answer the queued ones and stop the background thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._worker.join()
+
+
+class _InferenceRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    JSON endpoints of the inference server.
+
+    GET  /health  -> {"status": "ok", "active_version": ...}
+    GET  /stats   -> `TopicInferenceService.stats`
+    POST /infer   <- {"texts": [...]} or {"text": "..."}
+                  -> {"version": ..., "topics": [[[topic, probability], ...], ...]}
+    POST /models  <- {"path": "...", "version": "...", "dictionary_path": "..."}
+                  -> loads the model and makes it active
+    POST /activate <- {"version": "..."}
+
+    Loading a model unpickles it, so the server only answers requests whose
+    `Host` (and `Origin`, if sent) name the server itself, which web pages
+    cannot forge for another site, only accepts `application/json` POST
+    bodies, which web pages cannot send without a CORS preflight, and only
+    loads models from within `model_dir`.
+    """
+
+    service = None
+    model_dir = None
+    allowed_hosts = frozenset()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _check_host(self):
+        """Reject requests for other hosts (DNS rebinding) or from other origins."""
+        if self.headers.get("Host") not in self.allowed_hosts:
+            self._send_json(403, {"error": "Forbidden host"})
+            return False
+        origin = self.headers.get("Origin")
+        if origin is not None and origin.split("://", 1)[-1] not in self.allowed_hosts:
+            self._send_json(403, {"error": "Forbidden origin"})
+            return False
+        return True
+
+    def _model_path(self, path):
+        """Resolve a model path, which must lie within `model_dir`."""
+        resolved = os.path.realpath(os.path.join(self.model_dir, path))
+        if os.path.commonpath([resolved, self.model_dir]) != self.model_dir:
+            raise PermissionError(f"Models can only be loaded from {self.model_dir}")
+        return resolved
+
+    def do_GET(self):
+        if not self._check_host():
+            return
+        if self.path == "/health":
+            stats = self.service.stats()
+            self._send_json(
+                200, {"status": "ok", "active_version": stats["active_version"]}
+            )
+        elif self.path == "/stats":
+            self._send_json(200, self.service.stats())
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self._check_host():
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            payload = self._read_json()
+            if self.path == "/infer":
+                texts = payload["texts"] if "texts" in payload else [payload["text"]]
+                # Validate every text before queueing any of them
+                if not isinstance(texts, list) or not all(
+                    isinstance(text, str) for text in texts
+                ):
+                    raise TypeError("Email texts must be strings")
+                futures = [self.service.submit(text) for text in texts]
+                topics = [future.result() for future in futures]
+                versions = sorted({future.version for future in futures})
+                self._send_json(200, {"version": ",".join(versions), "topics": topics})
+            elif self.path == "/models":
+                dictionary_path = payload.get("dictionary_path")
+                version = self.service.load_model(
+                    self._model_path(payload["path"]),
+                    version=payload.get("version"),
+                    dictionary_path=(
+                        self._model_path(dictionary_path) if dictionary_path else None
+                    ),
+                    activate=payload.get("activate", True),
+                )
+                self._send_json(200, {"version": version})
+            elif self.path == "/activate":
+                self.service.activate(payload["version"])
+                self._send_json(200, {"version": payload["version"]})
+            else:
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+        except PermissionError as error:
+            self._send_json(403, {"error": str(error)})
+        except (KeyError, TypeError, ValueError) as error:
+            self._send_json(400, {"error": str(error)})
+        except RuntimeError as error:
+            # The service is closed or has no model loaded
+            self._send_json(503, {"error": str(error)})
+        except Exception as error:
+            self._send_json(500, {"error": str(error)})
+
+    def log_message(self, format, *args):
+        # Per-request access lines at DEBUG level only
+        self.service.logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def serve(service, host="127.0.0.1", port=8765, model_dir=None):
+    """
+    Serve the inference service over HTTP until interrupted.
+
+    Each connection is handled on its own thread; concurrent requests are
+    combined into batches by the service.
+
+    Parameters:
+        service (TopicInferenceService): The service with a loaded model.
+        host (str): Address to bind to. Defaults to localhost only.
+        port (int): Port to listen on. Defaults to 8765.
+        model_dir (str): The only directory `POST /models` may load from. Defaults to `<root>/data/models`.
+    """
+    if model_dir is None:
+        # Get the absolute path of the current directory (e.g., src)
+        current_dir = os.path.abspath(os.path.dirname(__file__))
+        # Navigate up one level to reach the root directory
+        root_dir = os.path.abspath(os.path.join(current_dir, "../"))
+        model_dir = f"{root_dir}/data/models"
+
+    handler = type("InferenceRequestHandler", (_InferenceRequestHandler,), {})
+    handler.service = service
+    handler.model_dir = os.path.realpath(model_dir)
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    # Host header values naming this server, with the actual port
+    port = server.server_address[1]
+    handler.allowed_hosts = frozenset(
+        f"{name}:{port}" for name in {host, "localhost", "127.0.0.1", "[::1]"}
+    )
+    service.logger.info(f"Topic inference server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    # Get the absolute path of the current directory (e.g., src)
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    # Navigate up one level to reach the root directory
+    root_dir = os.path.abspath(os.path.join(current_dir, "../"))
+
+    service = TopicInferenceService()
+    service.load_model(f"{root_dir}/data/models/lda.model")
+    print(service.infer(["Please review the gas trading contract before Friday."]))
+    serve(service)
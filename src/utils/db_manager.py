@@ -1,15 +1,15 @@
 import sqlite3
-import time
 import os
-import pandas as pd
+from utils.metrics import get_metrics
 
 
 class DatabaseManager:
-    def __init__(self, db_path, logger=None):
+    def __init__(self, db_path, logger=None, metrics=None):
         self.db_path = db_path
         self.conn = sqlite3.connect(f"{self.db_path}")
         self.cursor = self.conn.cursor()
         self.logger = logger
+        self.metrics = metrics or get_metrics()
 
     def load_db(self, table_name):
         """
@@ -33,14 +33,11 @@ class DatabaseManager:
 
         Parameters:
             df (pd.DataFrame): The DataFrame to save.
+            save_path (str): The path of the CSV file.
         """
-        save_start_time = time.time()
-        df.to_csv(save_path, index=False)
-        save_end_time = time.time()
+        with self.metrics.stage("save_to_csv", rows=len(df), logger=self.logger):
+            df.to_csv(save_path, index=False)
         if self.logger:
-            self.logger.info(
-                f"Emails saved to CSV in {save_end_time - save_start_time:.2f} seconds."
-            )
             self.logger.info(f"Parsed emails saved at {save_path}")
 
     def save_to_db(self, df, table_name):
@@ -51,22 +48,46 @@ class DatabaseManager:
             df (pd.DataFrame): The DataFrame to save.
             table_name (str): The name of the table to save the data to.
         """
-        save_start_time = time.time()
-        conn = sqlite3.connect(f"{self.db_path}")
-
-        # Convert list columns to strings before saving to SQLite
-        for column in df.columns:
-            if df[column].apply(type).eq(list).any():
-                df[column] = df[column].apply(str)
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
-        conn.close()
-        save_end_time = time.time()
+        with self.metrics.stage("save_to_db", rows=len(df), logger=self.logger):
+            conn = sqlite3.connect(f"{self.db_path}")
+
+            # Convert list columns to strings before saving to SQLite
+            for column in df.columns:
+                if df[column].apply(type).eq(list).any():
+                    df[column] = df[column].apply(str)
+            df.to_sql(table_name, conn, if_exists="replace", index=False)
+            conn.close()
         if self.logger:
-            self.logger.info(
-                f"Emails saved to SQLite database in {save_end_time - save_start_time:.2f} seconds."
-            )
             self.logger.info(f"Parsed emails saved at {self.db_path}")
 
+    def update_column(self, table_name, column, values, rowids):
+        """
+        Write one column into existing rows of a table, matched by rowid.
+
+        Unlike `save_to_db`, the table is not rewritten, so large columns
+        (e.g. the tokens) are never loaded to add a single result column.
+        The column is added to the table if it does not exist yet.
+
+        Parameters:
+            table_name (str): The name of the table to update.
+            column (str): The name of the column to write.
+            values (pd.Series): The values, one per row.
+            rowids (pd.Series): The SQLite rowids of the rows, aligned with `values`.
+        """
+        with self.metrics.stage("update_column", rows=len(values), logger=self.logger):
+            columns = [
+                row[1] for row in self.conn.execute(f'PRAGMA table_info("{table_name}")')
+            ]
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{column}"')
+            self.conn.executemany(
+                f'UPDATE "{table_name}" SET "{column}" = ? WHERE rowid = ?',
+                zip(values.tolist(), rowids.tolist()),
+            )
+            self.conn.commit()
+        if self.logger:
+            self.logger.info(f"Column {column} of {table_name} updated at {self.db_path}")
+
     @staticmethod
     def ensure_directory_exists(directory, logger=None):
         """
@@ -1,27 +1,47 @@
 # Utilities for the Enron Project
-import logging
 import os
 import time
+import queue
+import atexit
+import logging
 import logging.handlers
+import multiprocessing
+
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-from utils.db_manager import DatabaseManager
+# Process-wide logging state, set up once by `LoggerConfig.configure_process`
+_pid = None
+_listener = None
+_worker_queue = None
+_worker_listener = None
+_handlers = []
 
 
 class LoggerConfig:
     """
     A configuration class for setting up a logger with specified parameters.
 
+    Logging is configured once per process: the root logger gets a single
+    `QueueHandler`, and a `QueueListener` on a background thread writes the
+    records to one log file per run and to the console. Logging calls on the
+    pipeline's hot paths therefore only enqueue a record and never wait on I/O.
+
+    Worker processes forward their records to the parent's listener through
+    the multiprocessing queue returned by `get_worker_queue`, either as a pool
+    initializer (`LoggerConfig.configure_worker`) or automatically when forked
+    (e.g. by gensim `LdaMulticore`), so a run writes a single log file.
+
     Attributes:
-        log_dir (str): The directory where log files will be stored. Defaults to "./".
+        log_dir (str): The directory where log files will be stored. Defaults to "<root>/logs".
         log_level (int): The logging level (e.g., logging.INFO, logging.DEBUG). Defaults to logging.INFO.
         logger_name (str): The name of the logger. Defaults to "logger".
         logger (logging.Logger): The logger instance configured with the specified parameters.
 
     Methods:
         configure_logger():
-            Configures the logger with a file handler and a stream handler.
-            Creates the log directory if it does not exist.
-            Sets the logging format and date format.
+            Configures the process-wide queue-based logging on first use.
 
         get_logger():
             Returns the configured logger instance.
@@ -29,10 +49,9 @@ class LoggerConfig:
 
     def __init__(self, log_level=logging.INFO, logger_name="logger"):
         """
-        Initialize the LoggerConfig with directory, log level, and logger name.
+        Initialize the LoggerConfig with log level and logger name.
 
         Args:
-            log_dir (str): The directory where log files will be stored. Default is "./".
             log_level (int): The logging level (e.g., logging.INFO, logging.DEBUG). Default is logging.INFO.
             logger_name (str): The name of the logger. Default is "logger".
         """
@@ -47,61 +66,114 @@ class LoggerConfig:
         self.logger_name = logger_name
         # Create a logger instance with the specified name
         self.logger = logging.getLogger(self.logger_name)
-        # Ensure the log directory exists
-        DatabaseManager.ensure_directory_exists(self.log_dir, self.logger)
+        self.logger.setLevel(self.log_level)
         # Configure the logger
         self.configure_logger()
 
     def configure_logger(self):
         """
-        Configures the logger for the application.
-
-        This method sets up the logging configuration for the application. It ensures that the log directory exists,
-        defines the log file path, and configures the logging settings to log messages to both a file and the console.
+        Configure queue-based logging for the process, if not configured yet.
 
-        Attributes:
-            self.log_dir (str): The directory where log files will be stored.
-            self.logger_name (str): The name of the logger.
-            self.log_level (int): The logging level (e.g., logging.DEBUG, logging.INFO).
+        Later calls (e.g. from other classes in the same process) are no-ops,
+        so every logger of a run shares the same log file and listener thread.
+        """
+        LoggerConfig.configure_process(self.log_dir, self.log_level)
 
-        Creates:
-            The log directory if it does not exist.
+    @staticmethod
+    def configure_process(log_dir, log_level=logging.INFO):
+        """
+        Route the root logger through a queue to a background listener thread.
 
-        Logs:
-            Messages to a file named after the logger and to the console with a specific format and date format.
+        Parameters:
+            log_dir (str): The directory where the log file will be stored.
+            log_level (int): The logging level of the root logger.
         """
+        global _pid, _listener, _worker_queue, _worker_listener, _handlers
+        if _pid == os.getpid():
+            return
+
         # Create the log directory if it does not exist
-        if not os.path.exists(self.log_dir):
-            os.makedirs(self.log_dir)
+        os.makedirs(log_dir, exist_ok=True)
 
-        # Define the log file path all lower case
+        # One log file per run (and process)
         log_file = os.path.join(
-            self.log_dir,
-            f"{self.logger_name.lower()}_{time.strftime('%Y%m%d_%H%M%S')}.log",
+            log_dir, f"enron_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.log"
         )
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        _handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+        for handler in _handlers:
+            handler.setFormatter(formatter)
 
-        # Create a memory handler with a buffer size of 1000 log records
-        memory_handler = logging.handlers.MemoryHandler(
-            capacity=1000,
-            flushLevel=logging.ERROR,
-            target=logging.FileHandler(log_file),
+        # The listener thread owns the handlers; callers only enqueue records
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            log_queue, *_handlers, respect_handler_level=True
         )
+        _listener.start()
+        _install_queue_handler(log_queue, log_level)
 
-        # Configure the logging settings with the memory handler
-        logging.basicConfig(
-            level=self.log_level,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            handlers=[memory_handler, logging.StreamHandler()],
+        # Worker processes log through a multiprocessing queue to a second
+        # listener. It is created up front, so forked children always find it.
+        # Locks created in a spawn context may be shared with forked, spawned
+        # and forkserver workers alike
+        _worker_queue = multiprocessing.get_context("spawn").Queue(-1)
+        _worker_listener = logging.handlers.QueueListener(
+            _worker_queue, *_handlers, respect_handler_level=True
         )
+        _worker_listener.start()
+        _pid = os.getpid()
 
-    def flush_memory_handler(self):
+    @staticmethod
+    def get_worker_queue():
         """
-        Flush the memory handler to the file handler if there are log messages.
+        Return a multiprocessing queue that worker processes can log into.
+
+        The records are written by a listener thread in this process with the
+        same handlers as the process's own records.
+
+        Returns:
+            multiprocessing.Queue: The queue to pass to `configure_worker`.
         """
-        for handler in self.logger.handlers:
-            if isinstance(handler, logging.handlers.MemoryHandler):
-                handler.flush()
+        if _pid != os.getpid():
+            raise RuntimeError("Logging is not configured in this process")
+        return _worker_queue
+
+    @staticmethod
+    def configure_worker(log_queue, log_level=logging.INFO):
+        """
+        Forward the records of a worker process to the parent's listener.
+
+        Intended as the `initializer` of a process pool, e.g.
+        `ProcessPoolExecutor(initializer=LoggerConfig.configure_worker,
+        initargs=(LoggerConfig.get_worker_queue(),))`.
+
+        Parameters:
+            log_queue (multiprocessing.Queue): The queue from `get_worker_queue`.
+            log_level (int): The logging level of the root logger.
+        """
+        global _pid, _listener, _worker_queue, _worker_listener, _handlers
+        _install_queue_handler(log_queue, log_level)
+        # This process writes nothing itself, so later LoggerConfig calls are no-ops
+        _pid = os.getpid()
+        _listener = None
+        _worker_queue = log_queue
+        _worker_listener = None
+        _handlers = []
+
+    @staticmethod
+    def shutdown():
+        """
+        Stop the listener threads, writing out all queued records.
+        """
+        global _pid, _listener, _worker_listener
+        if _pid != os.getpid():
+            return
+        for listener in (_listener, _worker_listener):
+            if listener is not None:
+                listener.stop()
+        for handler in _handlers:
+            handler.close()
+        _pid = _listener = _worker_listener = None
 
     def get_logger(self):
         """
@@ -110,7 +182,121 @@ class LoggerConfig:
         Returns:
             logging.Logger: The configured logger instance.
         """
-        # Flush the memory handler before returning the logger
-        self.flush_memory_handler()
         # Return the configured logger instance
         return self.logger
+
+
+class ProgressLogger:
+    """
+    Rate-limited progress logging for per-item hot loops.
+
+    Instead of logging every item, `update` logs a single progress line every
+    `every` items or every `interval` seconds, whichever comes first, with the
+    number of items done and the throughput so far.
+
+    Attributes:
+        logger (logging.Logger): The logger instance for logging.
+        label (str): Description of the items, e.g. "files". Defaults to "items".
+        total (int): Total number of items, if known. Optional.
+        every (int): Log at most once every `every` items. Defaults to 10000.
+        interval (float): Log at least every `interval` seconds while updating. Defaults to 30.0.
+        level (int): The logging level of the progress lines. Defaults to logging.INFO.
+    """
+
+    def __init__(
+        self,
+        logger,
+        label="items",
+        total=None,
+        every=10000,
+        interval=30.0,
+        level=logging.INFO,
+    ):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.every = every
+        self.interval = interval
+        self.level = level
+        self.count = 0
+        self.start_time = time.monotonic()
+        self._last_time = self.start_time
+        self._next_count = every
+        self._next_check = 64
+
+    def update(self, n=1):
+        """
+        Record `n` processed items and log progress if it is due.
+
+        Parameters:
+            n (int): Number of items processed since the last update. Defaults to 1.
+        """
+        self.count += n
+        if self.count >= self._next_count:
+            self._log()
+        # Checking the clock is cheap, but not free: only every 64 items
+        elif self.count >= self._next_check:
+            self._next_check = self.count + 64
+            if time.monotonic() - self._last_time >= self.interval:
+                self._log()
+
+    def done(self):
+        """
+        Log the final count and throughput.
+        """
+        self._log(final=True)
+
+    def _log(self, final=False):
+        now = time.monotonic()
+        self._last_time = now
+        self._next_count = self.count + self.every
+        if not self.logger.isEnabledFor(self.level):
+            return
+        elapsed = now - self.start_time
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        done = f"{self.count}/{self.total}" if self.total else f"{self.count}"
+        status = "Finished" if final else "Processed"
+        self.logger.log(
+            self.level,
+            "%s %s %s in %.2f s (%.0f %s/s)",
+            status,
+            done,
+            self.label,
+            elapsed,
+            rate,
+            self.label,
+        )
+
+
+def _install_queue_handler(log_queue, log_level):
+    """
+    Replace the root logger's handlers with a single `QueueHandler`.
+
+    Parameters:
+        log_queue (queue.Queue): The queue the records are put on.
+        log_level (int): The logging level of the root logger.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(log_level)
+
+
+def _after_fork_in_child():
+    """
+    Keep logging working in forked children, where the listener threads are gone.
+
+    Records are forwarded to the parent's worker queue, which every configured
+    process has: the child never opens a log file or starts a listener, whose
+    queued records would be lost when pool children exit with `os._exit`.
+    """
+    if _pid is None or _worker_queue is None:
+        return
+    # Inherited multiprocessing queues remain connected to the parent
+    LoggerConfig.configure_worker(_worker_queue, logging.getLogger().level)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(LoggerConfig.shutdown)
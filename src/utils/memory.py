@@ -0,0 +1,87 @@
+# Memory-lean DataFrame helpers for the Enron Project
+
+try:
+    import pyarrow  # noqa: F401
+
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    # Without pyarrow, free text stays as Python object strings
+    STRING_DTYPE = None
+
+
+# Header columns with few distinct values across the corpus
+CATEGORICAL_COLUMNS = [
+    "folder",
+    "origin",
+    "filename",
+    "mime-version",
+    "content-type",
+    "content-transfer-encoding",
+    "priority",
+    "x-from",
+    "x-to",
+    "x-cc",
+    "x-bcc",
+]
+
+# Free text columns, stored as Arrow strings when pyarrow is available
+STRING_COLUMNS = [
+    "text",
+    "message_id",
+    "date",
+    "from",
+    "to",
+    "subject",
+    "cc",
+    "bcc",
+    "processed_text",
+    "stripped_date",
+]
+
+
+def optimize_dtypes(df, max_category_ratio=0.5, logger=None):
+    """
+    Convert object columns of the email DataFrame to compact dtypes in place.
+
+    Low-cardinality header columns become categoricals, as long as the share of
+    distinct values stays below `max_category_ratio` (e.g. `x-to` may be close
+    to unique on small mailboxes). Free text columns become Arrow strings when
+    pyarrow is installed.
+
+    Parameters:
+        df (pd.DataFrame): The DataFrame to convert.
+        max_category_ratio (float): Maximum ratio of distinct values to rows for a categorical. Defaults to 0.5.
+        logger (logging.Logger): The logger instance for logging. Optional.
+
+    Returns:
+        pd.DataFrame: The same DataFrame, with converted columns.
+    """
+    before = dataframe_memory_mb(df)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and df[column].dtype == object:
+            if df[column].nunique(dropna=False) <= max_category_ratio * len(df):
+                df[column] = df[column].astype("category")
+            elif STRING_DTYPE:
+                df[column] = df[column].astype(STRING_DTYPE)
+    if STRING_DTYPE:
+        for column in STRING_COLUMNS:
+            if column in df.columns and df[column].dtype == object:
+                df[column] = df[column].astype(STRING_DTYPE)
+    if logger:
+        logger.info(
+            f"DataFrame memory reduced from {before:.1f} MB to {dataframe_memory_mb(df):.1f} MB"
+        )
+    return df
+
+
+def dataframe_memory_mb(df):
+    """
+    Memory used by the DataFrame, including the Python objects it references.
+
+    Parameters:
+        df (pd.DataFrame): The DataFrame to measure.
+
+    Returns:
+        float: The memory usage in megabytes.
+    """
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
@@ -0,0 +1,359 @@
+# Per-stage metrics and profiling hooks for the Enron Project
+import os
+import sys
+import csv
+import json
+import time
+import cProfile
+import resource
+import functools
+import tracemalloc
+import contextlib
+
+
+# Number of stages currently being measured in this process, across recorders.
+# Peak RSS is process-wide, so only the outermost stage may reset and report it.
+_active_stages = 0
+# Only one cProfile profiler can be active at a time
+_profiling = False
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the current process in megabytes.
+
+    On Linux the peak is read from `/proc/self/status` so that it honours
+    `reset_peak_rss`; elsewhere it is the process-wide high-water mark.
+
+    Returns:
+        float: The peak resident set size.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def current_rss_mb():
+    """
+    Current resident set size of the process in megabytes.
+
+    Read from `/proc/self/status`, so only available on Linux.
+
+    Returns:
+        float: The resident set size, or None if it cannot be read.
+    """
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """
+    Reset the peak resident set size so the next reading covers a single stage.
+
+    Only supported on Linux (by writing to `/proc/self/clear_refs`); elsewhere
+    the peak stays a process-wide high-water mark.
+
+    Returns:
+        bool: True if the peak was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class StageTimer:
+    """
+    Measurements of a single pipeline stage, filled in by `MetricsRecorder.stage`.
+
+    Attributes:
+        name (str): The name of the stage.
+        rows (int): Number of rows processed, used to compute rows/s. Optional.
+        wall_time_s (float): Elapsed wall clock time in seconds.
+        cpu_time_s (float): CPU time of the process in seconds.
+        peak_rss_mb (float): Peak resident set size in megabytes, or None for a nested stage.
+        rss_mb (float): Resident set size at the end of the stage in megabytes (Linux only).
+        rss_delta_mb (float): Change of the resident set size over the stage in megabytes (Linux only).
+        nested (bool): True if the stage ran inside another stage.
+        traced_peak_mb (float): Peak memory allocated by Python (tracemalloc), if captured.
+        profile_path (str): Path of the cProfile output, if captured.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.wall_time_s = None
+        self.cpu_time_s = None
+        self.peak_rss_mb = None
+        self.rss_mb = None
+        self.rss_delta_mb = None
+        self.nested = False
+        self.traced_peak_mb = None
+        self.profile_path = None
+
+    @property
+    def rows_per_s(self):
+        """Throughput of the stage, or None if the row count is unknown."""
+        if self.rows is None or not self.wall_time_s:
+            return None
+        return self.rows / self.wall_time_s
+
+    def to_dict(self):
+        """
+        Convert the measurements to a flat dictionary.
+
+        Returns:
+            dict: The measurements, ready for the JSON or CSV sink.
+        """
+        return {
+            "stage": self.name,
+            "rows": self.rows,
+            "wall_time_s": self.wall_time_s,
+            "cpu_time_s": self.cpu_time_s,
+            "rows_per_s": self.rows_per_s,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rss_mb": self.rss_mb,
+            "rss_delta_mb": self.rss_delta_mb,
+            "nested": self.nested,
+            "traced_peak_mb": self.traced_peak_mb,
+            "profile_path": self.profile_path,
+        }
+
+
+class MetricsRecorder:
+    """
+    Record structured per-stage metrics for a pipeline run.
+
+    Stages are measured with the `stage` context manager or the `timed_stage`
+    decorator. Each stage records wall time, CPU time, rows/s and peak memory,
+    is logged as a single line, and is kept in `records` until saved with
+    `save` to a JSON or CSV file.
+
+    cProfile and tracemalloc capture are opt-in per stage since both slow
+    down the measured code. A stage is profiled or traced unless an enclosing
+    stage already is. Nested stages are recorded with `nested` set and
+    without peak RSS, since the high-water mark cannot be reset without
+    losing the enclosing stage's peak; their memory is compared by the RSS
+    at the end of the stage and its change over the stage.
+
+    Attributes:
+        run_name (str): Name of the run, used for output file names.
+        output_dir (str): Directory for the metrics sink and profiles. Defaults to `<root>/logs/metrics`.
+        profile (bool or set): Capture cProfile for all stages (True) or the named stages. Defaults to False.
+        trace_memory (bool or set): Capture tracemalloc for all stages (True) or the named stages. Defaults to False.
+        logger (logging.Logger): The logger instance for logging. Optional.
+        records (list): The dictionaries of the recorded stages.
+    """
+
+    def __init__(
+        self,
+        run_name=None,
+        output_dir=None,
+        profile=False,
+        trace_memory=False,
+        logger=None,
+    ):
+        # Get the absolute path of the current directory (e.g., src/utils)
+        current_dir = os.path.abspath(os.path.dirname(__file__))
+        # Navigate up two levels to reach the root directory
+        root_dir = os.path.abspath(os.path.join(current_dir, "../../"))
+
+        self.run_name = run_name or f"run_{time.strftime('%Y%m%d_%H%M%S')}"
+        self.output_dir = output_dir or f"{root_dir}/logs/metrics"
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.logger = logger
+        self.records = []
+
+    def _enabled(self, option, name):
+        """Check whether an opt-in capture (True or a set of stage names) covers `name`."""
+        if isinstance(option, bool):
+            return option
+        return name in option
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None, logger=None):
+        """
+        Measure the enclosed block as the stage `name`.
+
+        The row count may be passed up front or set on the yielded timer once
+        known, e.g. `timer.rows = len(df)`.
+
+        Parameters:
+            name (str): The name of the stage.
+            rows (int): Number of rows processed. Optional.
+            logger (logging.Logger): Logger for the summary line. Defaults to the recorder's logger.
+
+        Yields:
+            StageTimer: The timer, filled in when the block exits.
+        """
+        global _active_stages, _profiling
+        logger = logger or self.logger
+        timer = StageTimer(name, rows)
+        timer.nested = _active_stages > 0
+        profiler = None
+        tracing = False
+
+        if not timer.nested:
+            reset_peak_rss()
+        if self._enabled(self.profile, name) and not _profiling:
+            profiler = cProfile.Profile()
+            _profiling = True
+        if self._enabled(self.trace_memory, name) and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing = True
+
+        if logger:
+            logger.info(f"Starting {name}")
+        _active_stages += 1
+        start_rss = current_rss_mb()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield timer
+        finally:
+            if profiler:
+                profiler.disable()
+                _profiling = False
+            timer.wall_time_s = time.perf_counter() - start_wall
+            timer.cpu_time_s = time.process_time() - start_cpu
+            _active_stages -= 1
+            if not timer.nested:
+                timer.peak_rss_mb = peak_rss_mb()
+            timer.rss_mb = current_rss_mb()
+            if timer.rss_mb is not None and start_rss is not None:
+                timer.rss_delta_mb = timer.rss_mb - start_rss
+
+            if tracing:
+                timer.traced_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                tracemalloc.stop()
+            if profiler:
+                os.makedirs(self.output_dir, exist_ok=True)
+                timer.profile_path = os.path.join(
+                    self.output_dir, f"{self.run_name}_{name}.prof"
+                )
+                profiler.dump_stats(timer.profile_path)
+
+            self.records.append(timer.to_dict())
+            if logger:
+                throughput = (
+                    f", {timer.rows_per_s:.0f} rows/s" if timer.rows_per_s else ""
+                )
+                if timer.peak_rss_mb is not None:
+                    memory = f", peak RSS {timer.peak_rss_mb:.0f} MB"
+                elif timer.rss_delta_mb is not None:
+                    memory = (
+                        f", RSS {timer.rss_mb:.0f} MB ({timer.rss_delta_mb:+.0f} MB)"
+                    )
+                else:
+                    memory = ""
+                logger.info(
+                    f"Completed {name} in {timer.wall_time_s:.2f} s "
+                    f"(CPU {timer.cpu_time_s:.2f} s{throughput}{memory})"
+                )
+
+    def save(self, path=None):
+        """
+        Save the recorded stages to a JSON file, or a CSV file if the path ends in `.csv`.
+
+        Parameters:
+            path (str): Destination file path. Defaults to `<output_dir>/<run_name>.json`.
+
+        Returns:
+            str: The path the metrics were saved to.
+        """
+        path = path or os.path.join(self.output_dir, f"{self.run_name}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=list(StageTimer("").to_dict()))
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            with open(path, "w") as file:
+                json.dump({"run": self.run_name, "stages": self.records}, file, indent=2)
+        if self.logger:
+            self.logger.info(f"Metrics saved to: {path}")
+        return path
+
+    def reset(self):
+        """Clear the recorded stages."""
+        self.records = []
+
+
+# Process-wide recorder shared by the pipeline classes
+_default_recorder = None
+
+
+def get_metrics():
+    """
+    Return the process-wide metrics recorder, creating it on first use.
+
+    Returns:
+        MetricsRecorder: The shared recorder.
+    """
+    global _default_recorder
+    if _default_recorder is None:
+        _default_recorder = MetricsRecorder()
+    return _default_recorder
+
+
+def set_metrics(recorder):
+    """
+    Replace the process-wide metrics recorder, e.g. to enable profiling for a run.
+
+    Parameters:
+        recorder (MetricsRecorder): The recorder to use from now on.
+    """
+    global _default_recorder
+    _default_recorder = recorder
+
+
+def timed_stage(name, rows=None):
+    """
+    Decorate a method so that each call is measured as the stage `name`.
+
+    The stage is recorded on `self.metrics` when the instance has one, and on
+    the process-wide recorder otherwise, and is logged with `self.logger`.
+
+    Parameters:
+        name (str): The name of the stage.
+        rows (callable): Function of the return value giving the number of rows, e.g. `len`. Optional.
+
+    Returns:
+        callable: The decorator.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            recorder = getattr(self, "metrics", None) or get_metrics()
+            logger = getattr(self, "logger", None)
+            with recorder.stage(name, logger=logger) as timer:
+                result = func(self, *args, **kwargs)
+                if rows is not None:
+                    timer.rows = rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,261 @@
+# Synthetic Enron-like corpus generator for benchmarking
+import os
+import json
+import random
+import time
+import itertools
+from datetime import datetime, timedelta
+
+
+class SyntheticCorpusGenerator:
+    """
+    Generate synthetic Enron-shaped JSON mailboxes for reproducible benchmarks.
+
+    Each generated file mirrors the layout read by `DataWrangler.parse_emails`:
+    a top-level `text` body, a `headers` mapping with the usual RFC 822 and
+    `x-*` fields, and a `priority`. The content is shaped to exercise the
+    same code paths as the real corpus:
+
+    - Header mix: optional cc/bcc recipients and a small set of folders/origins.
+    - HTML share: a fraction of bodies is wrapped in HTML markup.
+    - Quoted chains: a fraction of bodies carries "Original Message" replies.
+    - Zipfian vocabulary: words are drawn with probability proportional to 1/rank^s.
+
+    Attributes:
+        seed (int): Seed for the random number generator. Defaults to 42.
+        vocab_size (int): Number of distinct words in the vocabulary. Defaults to 20000.
+        zipf_exponent (float): Exponent `s` of the Zipf distribution. Defaults to 1.1.
+        html_share (float): Fraction of messages with an HTML body. Defaults to 0.1.
+        quoted_share (float): Fraction of messages with a quoted reply chain. Defaults to 0.3.
+        cc_share (float): Fraction of messages with cc (and x-cc) headers. Defaults to 0.25.
+        bcc_share (float): Fraction of messages with bcc (and x-bcc) headers. Defaults to 0.05.
+        num_users (int): Number of distinct mailbox owners. Defaults to 150.
+        body_words (tuple): Min and max number of words in a message body. Defaults to (20, 400).
+    """
+
+    FOLDERS = [
+        "Inbox",
+        "Sent Items",
+        "Deleted Items",
+        "all_documents",
+        "discussion_threads",
+        "notes_inbox",
+        "calendar",
+        "_sent_mail",
+    ]
+    START_DATE = datetime(1999, 1, 1)
+    END_DATE = datetime(2002, 12, 31)
+
+    def __init__(
+        self,
+        seed=42,
+        vocab_size=20000,
+        zipf_exponent=1.1,
+        html_share=0.1,
+        quoted_share=0.3,
+        cc_share=0.25,
+        bcc_share=0.05,
+        num_users=150,
+        body_words=(20, 400),
+    ):
+        self.seed = seed
+        self.vocab_size = vocab_size
+        self.zipf_exponent = zipf_exponent
+        self.html_share = html_share
+        self.quoted_share = quoted_share
+        self.cc_share = cc_share
+        self.bcc_share = bcc_share
+        self.num_users = num_users
+        self.body_words = body_words
+
+        self.random = random.Random(self.seed)
+        self.vocabulary = self._build_vocabulary()
+        # Cumulative weights make `random.choices` O(log n) per draw
+        self.cum_weights = list(
+            itertools.accumulate(
+                1.0 / (rank**self.zipf_exponent)
+                for rank in range(1, self.vocab_size + 1)
+            )
+        )
+        self.users = self._build_users()
+
+    def _build_vocabulary(self):
+        """
+        Build a vocabulary of pronounceable pseudo-words, most frequent first.
+
+        Returns:
+            list: Distinct lower case words of length 2 to 12.
+        """
+        consonants = "bcdfghjklmnprstvwz"
+        vowels = "aeiou"
+        vocabulary = []
+        seen = set()
+        while len(vocabulary) < self.vocab_size:
+            syllables = 1 + min(5, int(self.random.expovariate(1.0) * 2))
+            word = "".join(
+                self.random.choice(consonants) + self.random.choice(vowels)
+                for _ in range(syllables)
+            )
+            if word not in seen:
+                seen.add(word)
+                vocabulary.append(word)
+        # Short words are the frequent words, as in natural language
+        vocabulary.sort(key=len)
+        return vocabulary
+
+    def _build_users(self):
+        """
+        Build the list of mailbox owners as (display name, address) pairs.
+
+        Returns:
+            list: Tuples of display name and email address.
+        """
+        users = []
+        for _ in range(self.num_users):
+            first, last = self.random.sample(self.vocabulary[:2000], 2)
+            name = f"{first.capitalize()} {last.capitalize()}"
+            users.append((name, f"{first}.{last}@enron.com"))
+        return users
+
+    def _words(self, count):
+        """Draw `count` words from the Zipfian vocabulary."""
+        return self.random.choices(
+            self.vocabulary, cum_weights=self.cum_weights, k=count
+        )
+
+    def _sentence_text(self, count):
+        """Join `count` words into sentences separated by punctuation and new lines."""
+        words = self._words(count)
+        lines = []
+        for i in range(0, len(words), 12):
+            lines.append(" ".join(words[i : i + 12]).capitalize() + ".")
+        return "\n".join(lines)
+
+    def _date(self):
+        """Draw a date between START_DATE and END_DATE in the Enron header format."""
+        span = int((self.END_DATE - self.START_DATE).total_seconds())
+        date = self.START_DATE + timedelta(seconds=self.random.randrange(span))
+        offset = self.random.choice(["-0700 (PDT)", "-0800 (PST)", "-0500 (CDT)"])
+        return date.strftime("%a, %d %b %Y %H:%M:%S ") + offset
+
+    def _body(self, sender):
+        """
+        Build the body text of a message with optional HTML and quoted chain.
+
+        Parameters:
+            sender (tuple): Display name and address of the sender.
+
+        Returns:
+            str: The body text.
+        """
+        low, high = self.body_words
+        text = self._sentence_text(self.random.randint(low, high))
+
+        # Occasionally embed a URL or address, which `text_extract` strips
+        if self.random.random() < 0.2:
+            text += f"\nSee http://www.{self._words(1)[0]}.com/{self._words(1)[0]}"
+        if self.random.random() < 0.2:
+            text += f"\nContact {self.random.choice(self.users)[1]}"
+
+        # Quoted reply chains of one to three earlier messages
+        if self.random.random() < self.quoted_share:
+            for _ in range(self.random.randint(1, 3)):
+                quoted_sender = self.random.choice(self.users)
+                text += (
+                    "\n\n -----Original Message-----\n"
+                    f"From: \t{quoted_sender[0]}  \nSent:\t{self._date()}\n"
+                    f"To:\t{sender[0]}\nSubject:\tRE: {' '.join(self._words(4))}\n\n"
+                    + self._sentence_text(self.random.randint(low, high // 2))
+                )
+
+        if self.random.random() < self.html_share:
+            paragraphs = "".join(f"<p>{line}</p>" for line in text.split("\n"))
+            text = f"<html><body><div>{paragraphs}</div></body></html>"
+        return text
+
+    def generate_email(self, index):
+        """
+        Generate a single email record.
+
+        Parameters:
+            index (int): Index of the email, used to build a unique message id.
+
+        Returns:
+            dict: The email in the Enron JSON layout.
+        """
+        sender = self.random.choice(self.users)
+        recipients = self.random.sample(self.users, self.random.randint(1, 4))
+        headers = {
+            "message-id": f"<{index}.{self.seed}.JavaMail.evans@thyme>",
+            "date": self._date(),
+            "from": sender[1],
+            "to": ", ".join(address for _, address in recipients),
+            "subject": " ".join(self._words(self.random.randint(1, 8))).capitalize(),
+            "mime-version": "1.0",
+            "content-type": "text/plain; charset=us-ascii",
+            "content-transfer-encoding": "7bit",
+            "x-from": sender[0],
+            "x-to": ", ".join(name for name, _ in recipients),
+            "x-folder": f"\\{sender[0]}\\{self.random.choice(self.FOLDERS)}",
+            "x-origin": sender[0].split()[-1] + "-" + sender[0][0],
+            "x-filename": f"{sender[0].split()[-1].lower()}.nsf",
+        }
+        if self.random.random() < self.cc_share:
+            cc = self.random.sample(self.users, self.random.randint(1, 3))
+            headers["cc"] = ", ".join(address for _, address in cc)
+            headers["x-cc"] = ", ".join(name for name, _ in cc)
+        if self.random.random() < self.bcc_share:
+            bcc = self.random.sample(self.users, self.random.randint(1, 2))
+            headers["bcc"] = ", ".join(address for _, address in bcc)
+            headers["x-bcc"] = ", ".join(name for name, _ in bcc)
+
+        return {
+            "text": self._body(sender),
+            "headers": headers,
+            "subject": headers["subject"],
+            "messageId": headers["message-id"],
+            "date": headers["date"],
+            "from": headers["from"],
+            "to": headers["to"],
+            "priority": self.random.choice(["", "", "", "normal", "high"]),
+        }
+
+    def generate(self, output_dir, num_emails, logger=None):
+        """
+        Write `num_emails` synthetic JSON files to `output_dir`.
+
+        The same seed always produces the same files, so benchmark runs at a
+        given scale are comparable across commits.
+
+        Parameters:
+            output_dir (str): Directory where the JSON files will be written.
+            num_emails (int): Number of emails to generate.
+            logger (logging.Logger): The logger instance for logging.
+
+        Returns:
+            str: The output directory.
+        """
+        start_time = time.time()
+        os.makedirs(output_dir, exist_ok=True)
+        for index in range(num_emails):
+            file_path = os.path.join(output_dir, f"{index:08d}.json")
+            with open(file_path, "w") as file:
+                json.dump(self.generate_email(index), file)
+        end_time = time.time()
+        if logger:
+            logger.info(
+                f"Generated {num_emails} synthetic emails in {output_dir} "
+                f"in {end_time - start_time:.2f} s"
+            )
+        return output_dir
+
+
+if __name__ == "__main__":
+    # Get the absolute path of the current directory (e.g., src/utils)
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    # Navigate up two levels to reach the root directory
+    root_dir = os.path.abspath(os.path.join(current_dir, "../../"))
+
+    generator = SyntheticCorpusGenerator(seed=42)
+    generator.generate(f"{root_dir}/data/synthetic/emails_1k", num_emails=1000)
+    print(json.dumps(generator.generate_email(0), indent=2))
@@ -0,0 +1,260 @@
+# Streaming vocabulary building with bounded-memory document frequencies
+import re
+import array
+import sqlite3
+import collections
+
+
+# Tokens saved to SQLite as the string of a Python list, e.g. "['enron', 'gas']"
+_QUOTED_TOKEN = re.compile(r"'([^']*)'")
+
+
+def parse_tokens(value):
+    """
+    Parse a tokens value as stored in the processed emails table.
+
+    `DatabaseManager.save_to_db` stores token lists as `str(list)`. Splitting
+    that string on whitespace produces garbage tokens such as "['enron',", so
+    the quoted tokens are extracted instead. Plain space separated strings and
+    lists are supported as well.
+
+    Parameters:
+        value (str or list): The stored tokens.
+
+    Returns:
+        list: The tokens.
+    """
+    if isinstance(value, list):
+        return value
+    if not isinstance(value, str):
+        return []
+    if value.startswith("["):
+        return _QUOTED_TOKEN.findall(value)
+    return value.split()
+
+
+class TokenStream:
+    """
+    Re-iterable stream of token lists read from SQLite in batches.
+
+    Only `batch_size` rows are held in memory at a time, so the documents can
+    be passed over several times (e.g. by `VocabularyBuilder`) without loading
+    the whole tokens column.
+
+    Attributes:
+        db_path (str): The path of the SQLite database.
+        table_name (str): The name of the table. Defaults to "emails_processed".
+        column (str): The name of the tokens column. Defaults to "tokens".
+        batch_size (int): Number of rows fetched at a time. Defaults to 10000.
+    """
+
+    def __init__(
+        self, db_path, table_name="emails_processed", column="tokens", batch_size=10000
+    ):
+        self.db_path = db_path
+        self.table_name = table_name
+        self.column = column
+        self.batch_size = batch_size
+
+    def __iter__(self):
+        connection = sqlite3.connect(self.db_path)
+        try:
+            cursor = connection.execute(
+                f'SELECT "{self.column}" FROM {self.table_name} ORDER BY rowid'
+            )
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for (value,) in rows:
+                    yield parse_tokens(value)
+        finally:
+            connection.close()
+
+
+class CountMinSketch:
+    """
+    Approximate counts of strings in fixed memory.
+
+    Each string increments one counter in each of `depth` rows of `width`
+    counters. The estimate is the minimum over the rows: it never
+    underestimates the true count, and overestimates it by at most
+    2 * total / width with high probability.
+
+    Attributes:
+        width (int): Number of counters per row. Defaults to 2**20.
+        depth (int): Number of rows. Defaults to 4.
+    """
+
+    def __init__(self, width=2**20, depth=4):
+        self.width = width
+        self.depth = depth
+        self.tables = [array.array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def _indexes(self, key):
+        # Double hashing derives `depth` indexes from one (cached) string hash
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(first + i * second) % self.width for i in range(self.depth)]
+
+    def add(self, key):
+        """Increment the count of `key` by one."""
+        for table, index in zip(self.tables, self._indexes(key)):
+            table[index] += 1
+
+    def estimate(self, key):
+        """Estimated count of `key` (never below the true count)."""
+        return min(
+            table[index] for table, index in zip(self.tables, self._indexes(key))
+        )
+
+    @property
+    def memory_mb(self):
+        """Memory used by the counters in megabytes."""
+        return self.depth * self.width * 4 / (1024 * 1024)
+
+
+class VocabularyBuilder:
+    """
+    Build a pruned gensim `Dictionary` from a stream of documents.
+
+    Streams (e.g. a `TokenStream`) are counted in two passes:
+
+    1. Document frequencies of all tokens are counted approximately in a
+       count-min sketch, whose memory does not grow with the vocabulary.
+    2. Exact document frequencies are counted only for tokens whose estimate
+       reaches `no_below`. Since the sketch never underestimates, no token that
+       qualifies is lost, while the long tail of rare tokens is never stored.
+
+    Documents already in memory (anything with a length, e.g. a pandas Series)
+    are counted exactly in a single pass, since the sketch would only add a
+    second pass over data that is loaded anyway.
+
+    The min/max document frequency and top-K limits are then applied, like
+    `Dictionary.filter_extremes`, before any document is converted to BoW.
+
+    Attributes:
+        no_below (int): Keep tokens in at least `no_below` documents. Defaults to 5.
+        no_above (float): Keep tokens in at most this fraction of documents. Defaults to 0.5.
+        keep_n (int): Keep at most the `keep_n` most frequent tokens, or all if None. Defaults to 100000.
+        sketch_width (int): Counters per row of the count-min sketch. Defaults to 2**20.
+        sketch_depth (int): Rows of the count-min sketch. Defaults to 4.
+        logger (logging.Logger): The logger instance for logging. Optional.
+    """
+
+    def __init__(
+        self,
+        no_below=5,
+        no_above=0.5,
+        keep_n=100000,
+        sketch_width=2**20,
+        sketch_depth=4,
+        logger=None,
+    ):
+        self.no_below = no_below
+        self.no_above = no_above
+        self.keep_n = keep_n
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.logger = logger
+
+    def build(self, documents):
+        """
+        Build the pruned dictionary.
+
+        Parameters:
+            documents (iterable): Token lists, e.g. a pandas Series, or a
+                re-iterable stream such as a `TokenStream`, iterated twice.
+
+        Returns:
+            gensim.corpora.Dictionary: Dictionary of the kept tokens, with
+            their exact document frequencies.
+        """
+        from gensim.corpora import Dictionary
+
+        if hasattr(documents, "__len__"):
+            dfs, num_docs, num_pos = self._count_exact(documents)
+            method = "exact counts"
+        else:
+            dfs, num_docs, num_pos, sketch = self._count_with_sketch(documents)
+            method = f"sketch {sketch.memory_mb:.0f} MB"
+
+        # Apply the document frequency limits, then keep the top-K tokens
+        max_df = self.no_above * num_docs
+        kept = [
+            token
+            for token, df in dfs.items()
+            if self.no_below <= df <= max_df
+        ]
+        kept.sort(key=lambda token: (-dfs[token], token))
+        if self.keep_n is not None:
+            kept = kept[: self.keep_n]
+
+        dictionary = Dictionary()
+        dictionary.token2id = {token: index for index, token in enumerate(kept)}
+        dictionary.dfs = {index: dfs[token] for index, token in enumerate(kept)}
+        dictionary.num_docs = num_docs
+        dictionary.num_pos = num_pos
+
+        if self.logger:
+            self.logger.info(
+                f"Vocabulary of {len(kept)} tokens kept from {len(dfs)} candidates "
+                f"over {num_docs} documents ({method})"
+            )
+        return dictionary
+
+    def _count_exact(self, documents):
+        """Exact document frequencies of all tokens in one pass."""
+        dfs = collections.Counter()
+        num_docs = 0
+        num_pos = 0
+        for tokens in documents:
+            num_docs += 1
+            num_pos += len(tokens)
+            dfs.update(set(tokens))
+        return dfs, num_docs, num_pos
+
+    def _count_with_sketch(self, documents):
+        """Exact document frequencies of the candidate tokens only, in two passes."""
+        # Pass 1: approximate document frequencies in bounded memory
+        sketch = CountMinSketch(self.sketch_width, self.sketch_depth)
+        num_docs = 0
+        for tokens in documents:
+            num_docs += 1
+            for token in set(tokens):
+                sketch.add(token)
+
+        # Pass 2: exact document frequencies of the candidate tokens only
+        dfs = {}
+        num_pos = 0
+        for tokens in documents:
+            num_pos += len(tokens)
+            for token in set(tokens):
+                if token in dfs:
+                    dfs[token] += 1
+                elif sketch.estimate(token) >= self.no_below:
+                    dfs[token] = 1
+        return dfs, num_docs, num_pos, sketch
+
+
+class BowStream:
+    """
+    Re-iterable bag-of-words corpus converted on the fly from a token stream.
+
+    gensim models iterate over the corpus in chunks, so a model trained
+    directly from a `BowStream` never holds the whole BoW corpus in memory.
+    `TopicModeling` materializes it as a list instead, since its engines and
+    time slices address documents by position.
+
+    Attributes:
+        documents (iterable): Re-iterable of token lists.
+        dictionary (gensim.corpora.Dictionary): The dictionary for the conversion.
+    """
+
+    def __init__(self, documents, dictionary):
+        self.documents = documents
+        self.dictionary = dictionary
+
+    def __iter__(self):
+        for tokens in self.documents:
+            yield self.dictionary.doc2bow(tokens)